@@ -1,12 +1,10 @@
 """python -m ApiProber"""
 import sys
-from pathlib import Path
 
-# Package-Dir sicherstellen
-PACKAGE_DIR = Path(__file__).resolve().parent
-_parent = str(PACKAGE_DIR.parent)
-if _parent not in sys.path:
-    sys.path.insert(0, _parent)
+# Nur ausserhalb des Pakets (z.B. `python ApiProber/`) den Parent-Pfad ergaenzen
+if not __package__:
+    import os
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ApiProber.api_prober import main
 
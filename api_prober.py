@@ -13,26 +13,35 @@ Verwendung:
     python api_prober.py resume <service>
     python api_prober.py config [--show | --set KEY VALUE]
 """
-import argparse
-import json
 import sys
-from pathlib import Path
 
-# Sicherstellen dass das Paket importierbar ist
-PACKAGE_DIR = Path(__file__).resolve().parent
-_parent = str(PACKAGE_DIR.parent)
-if _parent not in sys.path:
-    sys.path.insert(0, _parent)
+# Als Skript gestartet: sicherstellen dass das Paket importierbar ist
+if not __package__:
+    import os
+    _parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if _parent not in sys.path:
+        sys.path.insert(0, _parent)
 
 VERSION = "0.1.0"
 
+_BOOL_MAP = {"true": True, "false": False}
+
+# Eine Config pro CLI-Aufruf, von allen cmd_* geteilt
+_REQUEST_CONFIG = None
+
+
+def _request_config():
+    """Laedt die Konfiguration einmal pro Aufruf und gibt danach dasselbe dict zurueck."""
+    global _REQUEST_CONFIG
+    if _REQUEST_CONFIG is None:
+        from ApiProber.core.config import load_config
+        _REQUEST_CONFIG = load_config()
+    return _REQUEST_CONFIG
+
 
 def cmd_probe(args):
     """Probe-Modus: API abtasten."""
-    from ApiProber.core.config import load_config
-    from ApiProber.discovery.orchestrator import ProbeOrchestrator
-
-    config = load_config()
+    config = _request_config()
 
     # CLI-Overrides
     if args.depth is not None:
@@ -41,6 +50,8 @@ def cmd_probe(args):
         config["delay_ms"] = args.delay_ms
     if args.max_requests is not None:
         config["max_requests"] = args.max_requests
+    if args.concurrency is not None:
+        config["concurrency"] = args.concurrency
     if args.auth_type:
         config["auth"]["type"] = args.auth_type
     if args.auth_value:
@@ -48,8 +59,13 @@ def cmd_probe(args):
     if args.test_all_methods:
         config["skip_destructive"] = False
 
+    from ApiProber.discovery.orchestrator import ProbeOrchestrator
+
     orchestrator = ProbeOrchestrator(config)
-    result = orchestrator.probe(args.url, depth=args.depth)
+    try:
+        result = orchestrator.probe(args.url, depth=args.depth)
+    finally:
+        orchestrator.close()
 
     if result and result.get("error"):
         return 1
@@ -58,41 +74,43 @@ def cmd_probe(args):
 
 def cmd_list(args):
     """Alle bekannten Services auflisten."""
-    from ApiProber.core.config import get_db_path, load_config
+    from ApiProber.core.config import get_db_path
     from ApiProber.core.database import Database
 
-    config = load_config()
+    config = _request_config()
     db_path = get_db_path(config)
     if not db_path.exists():
         print("Keine Datenbank vorhanden. Starte zuerst ein Probing.")
         return 0
 
-    db = Database(db_path)
-    services = db.list_services()
+    db = Database(db_path, mmap_size=config.get("db_mmap_size", 0))
+    services = db.list_services_with_stats()
 
     if not services:
         print("Keine Services gespeichert.")
         return 0
 
-    print(f"{'Name':<25} {'Base-URL':<45} {'Endpoints':<10} {'Letztes Probing'}")
-    print("-" * 95)
+    lines = [
+        f"{'Name':<25} {'Base-URL':<45} {'Endpoints':<10} {'Letztes Probing'}",
+        "-" * 95,
+    ]
     for svc in services:
-        stats = db.get_service_stats(svc["id"])
         last = svc.get("last_probed", "-") or "-"
         if last and len(last) > 16:
             last = last[:16]
-        print(f"{svc['name']:<25} {svc['base_url']:<45} {stats['endpoints']:<10} {last}")
+        lines.append(f"{svc['name']:<25} {svc['base_url']:<45} {svc['endpoint_count']:<10} {last}")
+    print("\n".join(lines))
 
     return 0
 
 
 def cmd_status(args):
     """Status eines Services anzeigen."""
-    from ApiProber.core.config import get_db_path, load_config
+    from ApiProber.core.config import get_db_path
     from ApiProber.core.database import Database
 
-    config = load_config()
-    db = Database(get_db_path(config))
+    config = _request_config()
+    db = Database(get_db_path(config), mmap_size=config.get("db_mmap_size", 0))
 
     service = db.get_service(args.service)
     if not service:
@@ -101,7 +119,7 @@ def cmd_status(args):
 
     stats = db.get_service_stats(service["id"])
     endpoints = db.get_endpoints(service["id"])
-    runs = db.get_probe_runs(service["id"])
+    run_count = db.count_probe_runs(service["id"])
 
     print(f"Service: {service['name']}")
     print(f"URL:     {service['base_url']}")
@@ -112,26 +130,28 @@ def cmd_status(args):
     print(f"Endpoints:  {stats['endpoints']}")
     print(f"Responses:  {stats['responses']}")
     print(f"Parameter:  {stats['parameters']}")
-    print(f"Probe-Runs: {len(runs)}")
+    print(f"Probe-Runs: {run_count}")
     print()
 
     if endpoints:
-        print("Endpoints:")
+        # Alle Zeilen sammeln und in einem Write ausgeben
+        lines = ["Endpoints:"]
         for ep in endpoints:
-            methods = json.loads(ep.get("methods_json", "[]"))
+            methods = ep.get("methods", [])
             auth = " [AUTH]" if ep.get("auth_required") else ""
-            print(f"  {', '.join(methods) if methods else '?':<30} {ep['path']}{auth}")
+            lines.append(f"  {', '.join(methods) if methods else '?':<30} {ep['path']}{auth}")
+        print("\n".join(lines))
 
     return 0
 
 
 def cmd_export(args):
     """Export der Ergebnisse."""
-    from ApiProber.core.config import get_db_path, get_export_dir, load_config
+    from ApiProber.core.config import get_db_path, get_export_dir
     from ApiProber.core.database import Database
 
-    config = load_config()
-    db = Database(get_db_path(config))
+    config = _request_config()
+    db = Database(get_db_path(config), mmap_size=config.get("db_mmap_size", 0))
 
     service = db.get_service(args.service)
     if not service:
@@ -171,12 +191,14 @@ def cmd_export(args):
 
 def cmd_resume(args):
     """Vorheriges Probing fortsetzen."""
-    from ApiProber.core.config import load_config
     from ApiProber.discovery.orchestrator import ProbeOrchestrator
 
-    config = load_config()
+    config = _request_config()
     orchestrator = ProbeOrchestrator(config)
-    result = orchestrator.resume(args.service)
+    try:
+        result = orchestrator.resume(args.service)
+    finally:
+        orchestrator.close()
 
     if result is None:
         return 1
@@ -185,9 +207,11 @@ def cmd_resume(args):
 
 def cmd_config(args):
     """Konfiguration anzeigen oder setzen."""
-    from ApiProber.core.config import load_config, save_config
+    import json
 
-    config = load_config()
+    from ApiProber.core.config import save_config
+
+    config = _request_config()
 
     if args.show:
         print(json.dumps(config, indent=4, ensure_ascii=False))
@@ -197,16 +221,18 @@ def cmd_config(args):
         key = args.key
         value = args.value
 
-        # Typ-Konvertierung
-        if value.lower() in ("true", "false"):
-            value = value.lower() == "true"
-        elif value.isdigit():
-            value = int(value)
+        # Typ-Konvertierung (int vor float, damit "-1" ein int bleibt)
+        value_lower = value.lower()
+        if value_lower in _BOOL_MAP:
+            value = _BOOL_MAP[value_lower]
         else:
             try:
-                value = float(value)
+                value = int(value)
             except ValueError:
-                pass  # bleibt String
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass  # bleibt String
 
         # Verschachtelte Keys mit Punkt-Notation
         keys = key.split(".")
@@ -225,54 +251,92 @@ def cmd_config(args):
     return 0
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        prog="api_prober",
-        description="ApiProber -- Systematisches API-Probing fuer undokumentierte Services",
-    )
-    parser.add_argument("--version", "-V", action="store_true", help="Version anzeigen")
-    subparsers = parser.add_subparsers(dest="command")
-
-    # --- probe ---
+def _build_probe(subparsers):
     probe_parser = subparsers.add_parser("probe", help="API abtasten")
     probe_parser.add_argument("url", help="Basis-URL des Service")
     probe_parser.add_argument("--depth", type=int, default=None, help="Maximale Tiefe (default: 3)")
     probe_parser.add_argument("--delay-ms", type=int, default=None, help="Delay zwischen Requests in ms")
     probe_parser.add_argument("--max-requests", type=int, default=None, help="Maximale Anzahl Requests")
+    probe_parser.add_argument("--concurrency", type=int, default=None,
+                              help="Gleichzeitige Requests beim Wordlist-/Pattern-Probing (default: 1)")
     probe_parser.add_argument("--auth-type", choices=["bearer", "api_key", "basic"], help="Auth-Typ")
     probe_parser.add_argument("--auth-value", help="Auth-Wert (Token, Key, user:pass)")
     probe_parser.add_argument("--test-all-methods", action="store_true",
                               help="Auch POST/PUT/PATCH/DELETE testen (default: nur GET/HEAD/OPTIONS)")
     probe_parser.set_defaults(func=cmd_probe)
 
-    # --- list ---
+
+def _build_list(subparsers):
     list_parser = subparsers.add_parser("list", help="Alle Services auflisten")
     list_parser.set_defaults(func=cmd_list)
 
-    # --- status ---
+
+def _build_status(subparsers):
     status_parser = subparsers.add_parser("status", help="Service-Status anzeigen")
     status_parser.add_argument("service", help="Service-Name")
     status_parser.set_defaults(func=cmd_status)
 
-    # --- export ---
+
+def _build_export(subparsers):
     export_parser = subparsers.add_parser("export", help="Ergebnisse exportieren")
     export_parser.add_argument("service", help="Service-Name")
     export_parser.add_argument("--format", "-f", choices=["md", "json", "pdf"], default="md",
                                help="Export-Format (default: md)")
     export_parser.set_defaults(func=cmd_export)
 
-    # --- resume ---
+
+def _build_resume(subparsers):
     resume_parser = subparsers.add_parser("resume", help="Probing fortsetzen")
     resume_parser.add_argument("service", help="Service-Name")
     resume_parser.set_defaults(func=cmd_resume)
 
-    # --- config ---
+
+def _build_config(subparsers):
     config_parser = subparsers.add_parser("config", help="Konfiguration verwalten")
     config_parser.add_argument("--show", action="store_true", help="Aktuelle Konfiguration anzeigen")
     config_parser.add_argument("--set", nargs=2, metavar=("KEY", "VALUE"), dest="key_value",
                                help="Konfigurationswert setzen")
     config_parser.set_defaults(func=cmd_config)
 
+
+# Reihenfolge = Reihenfolge in der Hilfe
+_SUBCOMMANDS = {
+    "probe": _build_probe,
+    "list": _build_list,
+    "status": _build_status,
+    "export": _build_export,
+    "resume": _build_resume,
+    "config": _build_config,
+}
+
+
+def main():
+    global _REQUEST_CONFIG
+    _REQUEST_CONFIG = None
+
+    # --version ohne argparse beantworten
+    if sys.argv[1:2] in (["-V"], ["--version"]):
+        print(f"ApiProber v{VERSION}")
+        return 0
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="api_prober",
+        description="ApiProber -- Systematisches API-Probing fuer undokumentierte Services",
+    )
+    parser.add_argument("--version", "-V", action="store_true", help="Version anzeigen")
+    subparsers = parser.add_subparsers(dest="command")
+
+    # Nur den angefragten Subparser bauen; fuer Hilfe, Version und
+    # unbekannte Befehle alle (vollstaendige Hilfe / Fehlermeldung)
+    cmd = sys.argv[1] if len(sys.argv) > 1 else None
+    if cmd in _SUBCOMMANDS:
+        _SUBCOMMANDS[cmd](subparsers)
+    else:
+        for build in _SUBCOMMANDS.values():
+            build(subparsers)
+
     # Parsen
     args = parser.parse_args()
 
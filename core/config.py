@@ -2,94 +2,155 @@
 ApiProber.core.config -- Konfigurationsmanagement
 ===================================================
 Laedt, validiert und speichert Probe-Konfigurationen.
-Pattern: llmauto/core/config.py (DEFAULT + load/save + deepcopy)
+Pattern: llmauto/core/config.py (DEFAULT + load/save + Kopie)
 """
+import functools
 import json
+import os
+import warnings
 from pathlib import Path
-from copy import deepcopy
 
-BASE_DIR = Path(__file__).resolve().parent.parent
+# os.path.abspath statt Path.resolve(): kein realpath-stat pro Pfadkomponente
+BASE_DIR = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Listen-Defaults als Tupel: unveraenderlich, werden beim Klonen nicht kopiert.
+# Wer eine Liste aendern will, muss vorher list(...) aufrufen.
 DEFAULT_CONFIG = {
     "delay_ms": 500,
+    "rate_burst": 1,
+    "concurrency": 1,
     "max_requests": 500,
     "max_depth": 3,
     "timeout_seconds": 15,
+    "max_body_bytes": 65536,
     "user_agent": "ApiProber/0.1 (github.com/lukisch; passive-discovery)",
     "respect_robots_txt": True,
     "skip_destructive": True,
-    "strategies": ["openapi", "wordlist", "pattern", "response_driven"],
+    "trust_allow_header": True,
+    "strategies": ("openapi", "wordlist", "pattern", "response_driven"),
     "auth": {
         "type": "none",
         "value": ""
     },
-    "wordlists": [
+    "wordlists": (
         "common_rest.txt",
         "swagger_paths.txt",
         "auth_endpoints.txt",
         "admin_paths.txt"
-    ],
-    "pattern_versions": [1, 2, 3],
-    "pattern_resources": [
+    ),
+    "pattern_versions": (1, 2, 3),
+    "pattern_resources": (
         "users", "posts", "comments", "items", "products",
         "orders", "categories", "tags", "articles", "pages",
         "search", "settings", "config", "health", "status",
         "albums", "photos", "videos", "contacts", "customers",
         "tickets", "reviews", "collections", "templates"
-    ],
-    "methods_safe": ["GET", "HEAD", "OPTIONS"],
-    "methods_all": ["GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"],
+    ),
+    "methods_safe": ("GET", "HEAD", "OPTIONS"),
+    "methods_all": ("GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"),
     "export_dir": "exports",
-    "db_path": "data/api_prober.db"
+    "db_path": "data/api_prober.db",
+    "db_mmap_size": 0
 }
 
+# Beim Import vorberechnete Standardpfade
+_DEFAULT_CONFIG_PATH = BASE_DIR / "config.json"
+_DEFAULT_DB_PATH = BASE_DIR / DEFAULT_CONFIG["db_path"]
+_DEFAULT_EXPORT_DIR = BASE_DIR / DEFAULT_CONFIG["export_dir"]
+
 
 def load_config(config_path=None):
-    """Laedt Konfiguration aus JSON-Datei, merged mit Defaults."""
+    """Laedt Konfiguration aus JSON-Datei, merged mit Defaults.
+
+    Gibt immer eine eigene Kopie zurueck; Aufrufer duerfen sie veraendern.
+    """
     if config_path is None:
-        config_path = BASE_DIR / "config.json"
+        config_path = _DEFAULT_CONFIG_PATH
     else:
         config_path = Path(config_path)
 
-    config = deepcopy(DEFAULT_CONFIG)
-    if config_path.exists():
-        with open(config_path, "r", encoding="utf-8") as f:
-            user_config = json.load(f)
-        _deep_merge(config, user_config)
+    try:
+        mtime_ns = config_path.stat().st_mtime_ns
+    except OSError:
+        return _clone_json(DEFAULT_CONFIG)
+
+    return _clone_json(_load_config_cached(config_path, mtime_ns))
+
+
+@functools.lru_cache(maxsize=4)
+def _load_config_cached(config_path, mtime_ns):
+    """Parst und merged eine Config-Datei; mtime_ns im Key invalidiert bei Aenderungen.
+
+    Das Ergebnis wird geteilt und darf nicht veraendert werden.
+    """
+    config = _clone_json(DEFAULT_CONFIG)
+    user_config = json.loads(config_path.read_bytes())
+    _deep_merge(config, user_config)
     return config
 
 
 def save_config(config, config_path=None):
     """Speichert Konfiguration als JSON."""
     if config_path is None:
-        config_path = BASE_DIR / "config.json"
+        config_path = _DEFAULT_CONFIG_PATH
     else:
         config_path = Path(config_path)
 
-    with open(config_path, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=4, ensure_ascii=False)
+    _load_config_cached.cache_clear()
+    config_path.write_bytes(
+        json.dumps(config, indent=4, ensure_ascii=False).encode("utf-8")
+    )
 
 
 def get_db_path(config=None):
     """Gibt absoluten Pfad zur DB zurueck."""
     if config is None:
+        _warn_implicit_config()
         config = load_config()
     db_rel = config.get("db_path", DEFAULT_CONFIG["db_path"])
+    if db_rel == DEFAULT_CONFIG["db_path"]:
+        return _DEFAULT_DB_PATH
     return BASE_DIR / db_rel
 
 
 def get_export_dir(config=None):
     """Gibt absoluten Pfad zum Export-Verzeichnis zurueck."""
     if config is None:
+        _warn_implicit_config()
         config = load_config()
     export_rel = config.get("export_dir", DEFAULT_CONFIG["export_dir"])
+    if export_rel == DEFAULT_CONFIG["export_dir"]:
+        return _DEFAULT_EXPORT_DIR
     return BASE_DIR / export_rel
 
 
+def _warn_implicit_config():
+    warnings.warn(
+        "config=None ist veraltet -- bereits geladene Config explizit uebergeben",
+        DeprecationWarning, stacklevel=3,
+    )
+
+
 def _deep_merge(base, override):
-    """Rekursiver Merge: override ueberschreibt base in-place."""
-    for key, value in override.items():
-        if key in base and isinstance(base[key], dict) and isinstance(value, dict):
-            _deep_merge(base[key], value)
-        else:
-            base[key] = value
+    """Iterativer Merge: override ueberschreibt base in-place."""
+    stack = [(base, override)]
+    while stack:
+        target, source = stack.pop()
+        for key, value in source.items():
+            if key not in target:
+                target[key] = value
+                continue
+            current = target[key]
+            if isinstance(current, dict) and isinstance(value, dict):
+                stack.append((current, value))
+            else:
+                target[key] = value
+
+
+def _clone_json(obj):
+    """Tiefe Kopie fuer JSON-Werte (dict/list/Skalare), schneller als deepcopy."""
+    if isinstance(obj, dict):
+        return {k: _clone_json(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_clone_json(v) for v in obj]
+    return obj
@@ -1,33 +1,220 @@
 """
 ApiProber.core.database -- SQLite CRUD
 ========================================
-5 Tabellen: services, endpoints, responses, parameters, probe_runs
+6 Tabellen: services, endpoints, responses, parameters, probe_runs, openapi_cache
 Pattern: BACH hub/apibook.py (_ensure_table + CRUD)
 """
+import functools
 import json
+import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 
 
+# RETURNING gibt es erst ab SQLite 3.35
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Einmal gebauter Encoder: kompakte Ausgabe, ohne Options-Parsing pro Aufruf
+_dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+# Probe-Run-Zwischenstaende hoechstens einmal pro Sekunde schreiben
+_RUN_FLUSH_INTERVAL_NS = 1_000_000_000
+_FINAL_RUN_STATUSES = ("completed", "stopped", "error")
+
+# Maximale Laenge von responses.body_sample (Zeichen)
+_BODY_SAMPLE_CHARS = 2048
+
+
+def _json_union_sql(column):
+    """SQL-Ausdruck: sortierte Vereinigung zweier JSON-Arrays (alt + excluded)."""
+    return (
+        f"(SELECT json_group_array(value) FROM ("
+        f"SELECT value FROM json_each(endpoints.{column}) "
+        f"UNION SELECT value FROM json_each(excluded.{column}) "
+        f"ORDER BY value))"
+    )
+
+
+_UPSERT_SERVICE_SQL = """
+    INSERT INTO services (name, base_url, description, discovered_at,
+                          server_header, robots_txt, metadata_json)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(name) DO UPDATE SET
+        base_url = excluded.base_url,
+        description = CASE WHEN excluded.description != ''
+                      THEN excluded.description ELSE services.description END,
+        server_header = CASE WHEN excluded.server_header != ''
+                        THEN excluded.server_header ELSE services.server_header END,
+        robots_txt = CASE WHEN excluded.robots_txt != ''
+                     THEN excluded.robots_txt ELSE services.robots_txt END,
+        metadata_json = CASE WHEN excluded.metadata_json != '{}'
+                        THEN excluded.metadata_json ELSE services.metadata_json END
+"""
+
+
+def _json_adds_sql(column):
+    """SQL-Bedingung: excluded.column enthaelt Werte, die endpoints.column fehlen."""
+    return (
+        f"EXISTS (SELECT 1 FROM json_each(excluded.{column}) "
+        f"WHERE value NOT IN (SELECT value FROM json_each(endpoints.{column})))"
+    )
+
+
+# Das WHERE der DO-UPDATE-Klausel ueberspringt No-op-Updates: aendert sich
+# nichts, wird keine Page beschrieben (und RETURNING liefert keine Zeile)
+_UPSERT_ENDPOINT_SQL = f"""
+    INSERT INTO endpoints (service_id, path, methods_json, status_codes_json,
+                           auth_required, auth_type_hint, content_types_json,
+                           discovered_by)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(service_id, path) DO UPDATE SET
+        methods_json = {_json_union_sql("methods_json")},
+        status_codes_json = {_json_union_sql("status_codes_json")},
+        content_types_json = {_json_union_sql("content_types_json")},
+        auth_required = CASE WHEN excluded.auth_required THEN 1 ELSE endpoints.auth_required END,
+        auth_type_hint = CASE WHEN excluded.auth_type_hint != ''
+                         THEN excluded.auth_type_hint ELSE endpoints.auth_type_hint END
+    WHERE {_json_adds_sql("methods_json")}
+       OR {_json_adds_sql("status_codes_json")}
+       OR {_json_adds_sql("content_types_json")}
+       OR (excluded.auth_required AND NOT endpoints.auth_required)
+       OR (excluded.auth_type_hint != '' AND excluded.auth_type_hint != endpoints.auth_type_hint)
+"""
+
+_INSERT_RESPONSE_SQL = """
+    INSERT INTO responses (endpoint_id, method, status_code, headers_json,
+                           body_schema_json, body_sample, content_type, elapsed_ms,
+                           truncated, links_json)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_UPSERT_PARAMETER_SQL = """
+    INSERT INTO parameters (endpoint_id, name, param_type, location,
+                            required, example_value)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(endpoint_id, name, location) DO UPDATE SET
+        param_type = excluded.param_type,
+        required = CASE WHEN excluded.required THEN 1 ELSE parameters.required END,
+        example_value = CASE WHEN excluded.example_value != ''
+                        THEN excluded.example_value ELSE parameters.example_value END
+"""
+
+
 class Database:
     """SQLite-Datenbank fuer API-Probing-Ergebnisse."""
 
-    def __init__(self, db_path):
+    def __init__(self, db_path, mmap_size=0, max_readers=None):
         self.db_path = Path(db_path)
+        self.mmap_size = int(mmap_size)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Ein Writer (serialisiert per Lock) + Pool aus Read-Only-Connections:
+        # im WAL-Modus blockieren Leser den Writer nicht und umgekehrt
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._tx_owner = None
+        # Gesammelte, noch nicht geschriebene Probe-Run-Updates: run_id -> {Spalte: Wert}
+        self._pending_runs = {}
+        self._runs_flushed_ns = 0
+        self._readers = queue.LifoQueue(maxsize=max_readers or os.cpu_count() or 4)
         self._ensure_tables()
 
-    def _connect(self):
-        conn = sqlite3.connect(str(self.db_path))
+    def _open(self, readonly=False):
+        """Neue Connection im Autocommit-Modus (isolation_level=None) oeffnen."""
+        if readonly:
+            uri = self.db_path.resolve().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, isolation_level=None,
+                                   check_same_thread=False)
+        else:
+            conn = sqlite3.connect(str(self.db_path), isolation_level=None,
+                                   check_same_thread=False)
+            # WAL + synchronous=NORMAL: kein fsync pro Commit, nur beim Checkpoint
+            conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                PRAGMA foreign_keys=ON;
+                PRAGMA wal_autocheckpoint=1000;
+            """)
         conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(f"""
+            PRAGMA cache_size=-20000;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA busy_timeout=5000;
+            PRAGMA mmap_size={self.mmap_size};
+        """)
         return conn
 
-    def _ensure_tables(self):
-        conn = self._connect()
+    @contextmanager
+    def _write_conn(self):
+        """Die Writer-Connection, exklusiv fuer den aufrufenden Thread."""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open()
+            yield self._writer
+
+    @contextmanager
+    def _read_conn(self):
+        """Read-Only-Connection aus dem Pool leihen.
+
+        Innerhalb einer eigenen offenen Transaktion wird der Writer benutzt,
+        damit der Thread seine noch nicht committeten Writes sieht.
+        """
+        if self._tx_owner == threading.get_ident():
+            yield self._writer
+            return
         try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._open(readonly=True)
+        try:
+            yield conn
+        finally:
+            try:
+                self._readers.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Fasst mehrere Writes zu einer Transaktion zusammen (ein Commit statt N).
+
+        Verschachtelte Aufrufe laufen in der aeusseren Transaktion mit.
+        """
+        with self._write_conn() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            self._tx_owner = threading.get_ident()
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+            finally:
+                self._tx_owner = None
+
+    def close(self):
+        """Writer und alle gepoolten Reader schliessen (offene Run-Updates vorher schreiben)."""
+        with self._write_lock:
+            self._flush_probe_runs()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _ensure_tables(self):
+        with self._write_conn() as conn:
             conn.executescript("""
                 CREATE TABLE IF NOT EXISTS services (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -63,7 +250,9 @@ class Database:
                     body_schema_json TEXT DEFAULT '{}',
                     body_sample TEXT DEFAULT '',
                     content_type TEXT DEFAULT '',
-                    elapsed_ms INTEGER DEFAULT 0
+                    elapsed_ms INTEGER DEFAULT 0,
+                    truncated INTEGER DEFAULT 0,
+                    links_json TEXT
                 );
 
                 CREATE TABLE IF NOT EXISTS parameters (
@@ -77,6 +266,12 @@ class Database:
                     UNIQUE(endpoint_id, name, location)
                 );
 
+                CREATE TABLE IF NOT EXISTS openapi_cache (
+                    digest TEXT PRIMARY KEY,
+                    endpoints_json TEXT NOT NULL,
+                    parsed_at TEXT DEFAULT CURRENT_TIMESTAMP
+                );
+
                 CREATE TABLE IF NOT EXISTS probe_runs (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     service_id INTEGER NOT NULL REFERENCES services(id),
@@ -88,10 +283,20 @@ class Database:
                     endpoints_found INTEGER DEFAULT 0,
                     progress_json TEXT DEFAULT '{}'
                 );
+
+                -- endpoints(service_id) und parameters(endpoint_id) sind bereits
+                -- ueber die UNIQUE-Indizes (linkes Praefix) abgedeckt
+                CREATE INDEX IF NOT EXISTS idx_responses_endpoint
+                    ON responses(endpoint_id);
+                CREATE INDEX IF NOT EXISTS idx_probe_runs_service
+                    ON probe_runs(service_id);
             """)
-            conn.commit()
-        finally:
-            conn.close()
+            # Aeltere DBs: Spalten nachruesten (links_json bleibt dort NULL)
+            columns = {r[1] for r in conn.execute("PRAGMA table_info(responses)")}
+            for column, decl in (("truncated", "INTEGER DEFAULT 0"),
+                                 ("links_json", "TEXT")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE responses ADD COLUMN {column} {decl}")
 
     # ── Services ──────────────────────────────────────────────────────────
 
@@ -99,314 +304,400 @@ class Database:
                        robots_txt="", metadata=None):
         """Service anlegen oder aktualisieren. Gibt service_id zurueck."""
         now = datetime.utcnow().isoformat()
-        meta_json = json.dumps(metadata or {}, ensure_ascii=False)
-        conn = self._connect()
-        try:
-            conn.execute("""
-                INSERT INTO services (name, base_url, description, discovered_at,
-                                      server_header, robots_txt, metadata_json)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(name) DO UPDATE SET
-                    base_url = excluded.base_url,
-                    description = CASE WHEN excluded.description != ''
-                                  THEN excluded.description ELSE services.description END,
-                    server_header = CASE WHEN excluded.server_header != ''
-                                   THEN excluded.server_header ELSE services.server_header END,
-                    robots_txt = CASE WHEN excluded.robots_txt != ''
-                                 THEN excluded.robots_txt ELSE services.robots_txt END,
-                    metadata_json = CASE WHEN excluded.metadata_json != '{}'
-                                    THEN excluded.metadata_json ELSE services.metadata_json END
-            """, (name, base_url, description, now, server_header, robots_txt, meta_json))
-            conn.commit()
+        meta_json = _dumps(metadata or {})
+        params = (name, base_url, description, now, server_header, robots_txt, meta_json)
+        with self._write_conn() as conn:
+            if _HAS_RETURNING:
+                return conn.execute(_UPSERT_SERVICE_SQL + " RETURNING id", params).fetchone()[0]
+            conn.execute(_UPSERT_SERVICE_SQL, params)
             row = conn.execute("SELECT id FROM services WHERE name = ?", (name,)).fetchone()
             return row["id"]
-        finally:
-            conn.close()
 
     def get_service(self, name):
         """Service nach Name suchen. Gibt dict oder None zurueck."""
-        conn = self._connect()
-        try:
+        with self._read_conn() as conn:
             row = conn.execute("SELECT * FROM services WHERE name = ?", (name,)).fetchone()
             return dict(row) if row else None
-        finally:
-            conn.close()
 
     def get_service_by_id(self, service_id):
-        conn = self._connect()
-        try:
+        with self._read_conn() as conn:
             row = conn.execute("SELECT * FROM services WHERE id = ?", (service_id,)).fetchone()
             return dict(row) if row else None
-        finally:
-            conn.close()
 
     def list_services(self):
         """Alle Services als Liste von dicts."""
-        conn = self._connect()
-        try:
+        with self._read_conn() as conn:
             rows = conn.execute("SELECT * FROM services ORDER BY name").fetchall()
             return [dict(r) for r in rows]
-        finally:
-            conn.close()
+
+    def list_services_with_stats(self):
+        """Alle Services inkl. Endpoint-Anzahl ("endpoint_count") in einer Query."""
+        with self._read_conn() as conn:
+            rows = conn.execute(
+                "SELECT s.*, COUNT(e.id) AS endpoint_count FROM services s "
+                "LEFT JOIN endpoints e ON e.service_id = s.id "
+                "GROUP BY s.id ORDER BY s.name"
+            ).fetchall()
+            return [dict(r) for r in rows]
 
     def update_service_last_probed(self, service_id):
         now = datetime.utcnow().isoformat()
-        conn = self._connect()
-        try:
+        with self._write_conn() as conn:
             conn.execute("UPDATE services SET last_probed = ? WHERE id = ?", (now, service_id))
-            conn.commit()
-        finally:
-            conn.close()
 
     # ── Endpoints ─────────────────────────────────────────────────────────
 
     def upsert_endpoint(self, service_id, path, methods=None, status_codes=None,
                         auth_required=False, auth_type_hint="", content_types=None,
                         discovered_by=""):
-        """Endpoint anlegen oder aktualisieren. Gibt endpoint_id zurueck."""
-        conn = self._connect()
-        try:
-            existing = conn.execute(
-                "SELECT id, methods_json, status_codes_json, content_types_json "
-                "FROM endpoints WHERE service_id = ? AND path = ?",
-                (service_id, path)
-            ).fetchone()
-
-            if existing:
-                # Merge: bestehende Listen erweitern
-                old_methods = set(json.loads(existing["methods_json"]))
-                old_codes = set(json.loads(existing["status_codes_json"]))
-                old_types = set(json.loads(existing["content_types_json"]))
-                if methods:
-                    old_methods.update(methods)
-                if status_codes:
-                    old_codes.update(status_codes)
-                if content_types:
-                    old_types.update(content_types)
-
-                conn.execute("""
-                    UPDATE endpoints SET
-                        methods_json = ?,
-                        status_codes_json = ?,
-                        content_types_json = ?,
-                        auth_required = CASE WHEN ? THEN 1 ELSE auth_required END,
-                        auth_type_hint = CASE WHEN ? != '' THEN ? ELSE auth_type_hint END
-                    WHERE id = ?
-                """, (
-                    json.dumps(sorted(old_methods)),
-                    json.dumps(sorted(old_codes)),
-                    json.dumps(sorted(old_types)),
-                    auth_required, auth_type_hint, auth_type_hint,
-                    existing["id"]
-                ))
-                conn.commit()
-                return existing["id"]
+        """Endpoint anlegen oder aktualisieren. Gibt endpoint_id zurueck.
+
+        Bestehende Listen werden in SQL (JSON1) vereinigt und sortiert,
+        ohne Row-Roundtrip nach Python. Bringt der Aufruf nichts Neues,
+        wird die Zeile nicht geschrieben.
+        """
+        params = (
+            service_id, path,
+            _dumps(sorted(methods or [])),
+            _dumps(sorted(status_codes or [])),
+            1 if auth_required else 0,
+            auth_type_hint,
+            _dumps(sorted(content_types or [])),
+            discovered_by
+        )
+        with self._write_conn() as conn:
+            if _HAS_RETURNING:
+                row = conn.execute(_UPSERT_ENDPOINT_SQL + " RETURNING id", params).fetchone()
+                if row is not None:
+                    return row[0]
             else:
-                cur = conn.execute("""
-                    INSERT INTO endpoints (service_id, path, methods_json, status_codes_json,
-                                           auth_required, auth_type_hint, content_types_json,
-                                           discovered_by)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    service_id, path,
-                    json.dumps(sorted(methods or [])),
-                    json.dumps(sorted(status_codes or [])),
-                    1 if auth_required else 0,
-                    auth_type_hint,
-                    json.dumps(sorted(content_types or [])),
-                    discovered_by
-                ))
-                conn.commit()
-                return cur.lastrowid
-        finally:
-            conn.close()
+                conn.execute(_UPSERT_ENDPOINT_SQL, params)
+            return conn.execute(
+                "SELECT id FROM endpoints WHERE service_id = ? AND path = ?",
+                (service_id, path)
+            ).fetchone()[0]
 
     def get_endpoints(self, service_id):
-        """Alle Endpoints eines Services."""
-        conn = self._connect()
-        try:
+        """Alle Endpoints eines Services (mit dekodierter "methods"-Liste)."""
+        with self._read_conn() as conn:
             rows = conn.execute(
                 "SELECT * FROM endpoints WHERE service_id = ? ORDER BY path",
                 (service_id,)
             ).fetchall()
-            return [dict(r) for r in rows]
-        finally:
-            conn.close()
+            return [_endpoint_dict(r) for r in rows]
+
+    def iter_endpoints(self, service_id, batch=500):
+        """Wie get_endpoints, aber als Generator (fetchmany in Bloecken von batch).
+
+        Die Read-Connection bleibt belegt, bis der Generator erschoepft
+        oder geschlossen ist.
+        """
+        with self._read_conn() as conn:
+            cursor = conn.execute(
+                "SELECT * FROM endpoints WHERE service_id = ? ORDER BY path",
+                (service_id,)
+            )
+            while True:
+                rows = cursor.fetchmany(batch)
+                if not rows:
+                    return
+                for r in rows:
+                    yield _endpoint_dict(r)
 
     def get_endpoint_paths(self, service_id):
         """Nur die Pfade eines Services (fuer schnellen Check)."""
-        conn = self._connect()
-        try:
+        with self._read_conn() as conn:
             rows = conn.execute(
                 "SELECT path FROM endpoints WHERE service_id = ?",
                 (service_id,)
             ).fetchall()
             return {r["path"] for r in rows}
-        finally:
-            conn.close()
 
     # ── Responses ─────────────────────────────────────────────────────────
 
     def add_response(self, endpoint_id, method, status_code, headers=None,
-                     body_schema=None, body_sample="", content_type="", elapsed_ms=0):
-        """Response-Datensatz speichern."""
-        # body_sample auf 2KB beschraenken
-        if len(body_sample) > 2048:
-            body_sample = body_sample[:2048]
-        conn = self._connect()
-        try:
-            conn.execute("""
-                INSERT INTO responses (endpoint_id, method, status_code, headers_json,
-                                       body_schema_json, body_sample, content_type, elapsed_ms)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                endpoint_id, method, status_code,
-                json.dumps(headers or {}, ensure_ascii=False),
-                json.dumps(body_schema or {}, ensure_ascii=False),
-                body_sample, content_type, elapsed_ms
+                     body_schema=None, body_sample="", content_type="", elapsed_ms=0,
+                     truncated=False, links=None):
+        """Response-Datensatz speichern.
+
+        truncated markiert Bodies, die der HttpClient bei max_body_bytes
+        abgeschnitten hat; links sind die aus dem Body extrahierten Pfade
+        (fuer Response-Driven Discovery).
+        """
+        with self._write_conn() as conn:
+            conn.execute(_INSERT_RESPONSE_SQL, _response_params(
+                endpoint_id, method, status_code, headers, body_schema,
+                body_sample, content_type, elapsed_ms, truncated, links
             ))
-            conn.commit()
-        finally:
-            conn.close()
+
+    def add_responses_bulk(self, rows):
+        """Mehrere Responses in einer Transaktion speichern.
+
+        Args:
+            rows: Iterable von dicts mit den Argumenten von add_response
+        """
+        params = [
+            _response_params(
+                r["endpoint_id"], r["method"], r["status_code"], r.get("headers"),
+                r.get("body_schema"), r.get("body_sample", ""),
+                r.get("content_type", ""), r.get("elapsed_ms", 0),
+                r.get("truncated", False), r.get("links")
+            )
+            for r in rows
+        ]
+        if not params:
+            return
+        with self.transaction() as conn:
+            conn.executemany(_INSERT_RESPONSE_SQL, params)
+
+    def has_fresh_get_response(self, endpoint_id, min_status=200, max_status=399):
+        """True wenn fuer den Endpoint schon eine GET-Response im Statusbereich gespeichert ist."""
+        with self._read_conn() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM responses WHERE endpoint_id = ? AND method = 'GET'"
+                " AND status_code BETWEEN ? AND ? LIMIT 1",
+                (endpoint_id, min_status, max_status)
+            ).fetchone()
+            return row is not None
 
     def get_responses(self, endpoint_id):
-        conn = self._connect()
-        try:
+        with self._read_conn() as conn:
             rows = conn.execute(
-                "SELECT * FROM responses WHERE endpoint_id = ? ORDER BY method",
+                "SELECT * FROM responses WHERE endpoint_id = ? ORDER BY method, id",
                 (endpoint_id,)
             ).fetchall()
             return [dict(r) for r in rows]
-        finally:
-            conn.close()
+
+    def get_responses_for_service(self, service_id):
+        """Alle Responses eines Services in einer Query.
+
+        Returns:
+            dict: {endpoint_id: [response, ...]} (je Endpoint wie get_responses)
+        """
+        with self._read_conn() as conn:
+            rows = conn.execute(
+                "SELECT r.* FROM responses r JOIN endpoints e ON e.id = r.endpoint_id"
+                " WHERE e.service_id = ? ORDER BY r.endpoint_id, r.method, r.id",
+                (service_id,)
+            ).fetchall()
+            return _group_by_endpoint(rows)
 
     # ── Parameters ────────────────────────────────────────────────────────
 
     def upsert_parameter(self, endpoint_id, name, param_type="string",
                          location="query", required=False, example_value=""):
-        conn = self._connect()
-        try:
-            conn.execute("""
-                INSERT INTO parameters (endpoint_id, name, param_type, location,
-                                        required, example_value)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ON CONFLICT(endpoint_id, name, location) DO UPDATE SET
-                    param_type = excluded.param_type,
-                    required = CASE WHEN excluded.required THEN 1 ELSE parameters.required END,
-                    example_value = CASE WHEN excluded.example_value != ''
-                                    THEN excluded.example_value ELSE parameters.example_value END
-            """, (endpoint_id, name, param_type, location, 1 if required else 0, example_value))
-            conn.commit()
-        finally:
-            conn.close()
+        with self._write_conn() as conn:
+            conn.execute(_UPSERT_PARAMETER_SQL, (
+                endpoint_id, name, param_type, location, 1 if required else 0, example_value
+            ))
+
+    def upsert_parameters_bulk(self, rows):
+        """Mehrere Parameter in einer Transaktion anlegen/aktualisieren.
+
+        Args:
+            rows: Iterable von dicts mit den Argumenten von upsert_parameter
+        """
+        params = [
+            (
+                r["endpoint_id"], r["name"], r.get("param_type", "string"),
+                r.get("location", "query"), 1 if r.get("required") else 0,
+                r.get("example_value", "")
+            )
+            for r in rows
+        ]
+        if not params:
+            return
+        with self.transaction() as conn:
+            conn.executemany(_UPSERT_PARAMETER_SQL, params)
 
     def get_parameters(self, endpoint_id):
-        conn = self._connect()
-        try:
+        with self._read_conn() as conn:
             rows = conn.execute(
                 "SELECT * FROM parameters WHERE endpoint_id = ? ORDER BY location, name",
                 (endpoint_id,)
             ).fetchall()
             return [dict(r) for r in rows]
-        finally:
-            conn.close()
+
+    def get_parameters_for_service(self, service_id):
+        """Alle Parameter eines Services in einer Query.
+
+        Returns:
+            dict: {endpoint_id: [parameter, ...]} (je Endpoint wie get_parameters)
+        """
+        with self._read_conn() as conn:
+            rows = conn.execute(
+                "SELECT p.* FROM parameters p JOIN endpoints e ON e.id = p.endpoint_id"
+                " WHERE e.service_id = ? ORDER BY p.endpoint_id, p.location, p.name",
+                (service_id,)
+            ).fetchall()
+            return _group_by_endpoint(rows)
 
     # ── Probe Runs ────────────────────────────────────────────────────────
 
     def create_probe_run(self, service_id, config=None):
         """Neuen Probe-Run starten. Gibt run_id zurueck."""
-        conn = self._connect()
-        try:
+        with self._write_conn() as conn:
             cur = conn.execute("""
                 INSERT INTO probe_runs (service_id, config_json)
                 VALUES (?, ?)
-            """, (service_id, json.dumps(config or {}, ensure_ascii=False)))
-            conn.commit()
+            """, (service_id, _dumps(config or {})))
             return cur.lastrowid
-        finally:
-            conn.close()
 
     def update_probe_run(self, run_id, status=None, total_requests=None,
                          endpoints_found=None, progress=None):
-        """Probe-Run aktualisieren."""
-        conn = self._connect()
-        try:
-            updates = []
-            params = []
-            if status is not None:
-                updates.append("status = ?")
-                params.append(status)
-                if status in ("completed", "stopped", "error"):
-                    updates.append("finished_at = ?")
-                    params.append(datetime.utcnow().isoformat())
-            if total_requests is not None:
-                updates.append("total_requests = ?")
-                params.append(total_requests)
-            if endpoints_found is not None:
-                updates.append("endpoints_found = ?")
-                params.append(endpoints_found)
-            if progress is not None:
-                updates.append("progress_json = ?")
-                params.append(json.dumps(progress, ensure_ascii=False))
-            if updates:
-                params.append(run_id)
-                conn.execute(
-                    f"UPDATE probe_runs SET {', '.join(updates)} WHERE id = ?",
-                    params
-                )
-                conn.commit()
-        finally:
-            conn.close()
+        """Probe-Run aktualisieren.
+
+        Zwischenstaende werden gesammelt und hoechstens einmal pro Sekunde
+        geschrieben; ein End-Status (completed/stopped/error) schreibt sofort.
+        """
+        fields = {}
+        if status is not None:
+            fields["status"] = status
+            if status in _FINAL_RUN_STATUSES:
+                fields["finished_at"] = datetime.utcnow().isoformat()
+        if total_requests is not None:
+            fields["total_requests"] = total_requests
+        if endpoints_found is not None:
+            fields["endpoints_found"] = endpoints_found
+        if progress is not None:
+            fields["progress_json"] = _dumps(progress)
+        if not fields:
+            return
+        with self._write_lock:
+            self._pending_runs.setdefault(run_id, {}).update(fields)
+            if (status in _FINAL_RUN_STATUSES
+                    or time.monotonic_ns() - self._runs_flushed_ns >= _RUN_FLUSH_INTERVAL_NS):
+                self._flush_probe_runs()
+
+    def _flush_probe_runs(self):
+        """Gesammelte Probe-Run-Updates in einer Transaktion schreiben."""
+        with self._write_lock:
+            pending, self._pending_runs = self._pending_runs, {}
+            self._runs_flushed_ns = time.monotonic_ns()
+            if not pending:
+                return
+            with self.transaction() as conn:
+                for run_id, fields in pending.items():
+                    conn.execute(
+                        f"UPDATE probe_runs SET {', '.join(f'{c} = ?' for c in fields)} "
+                        f"WHERE id = ?",
+                        (*fields.values(), run_id)
+                    )
 
     def get_last_probe_run(self, service_id):
         """Letzten Run eines Services holen."""
-        conn = self._connect()
-        try:
+        self._flush_probe_runs()
+        with self._read_conn() as conn:
             row = conn.execute(
                 "SELECT * FROM probe_runs WHERE service_id = ? ORDER BY id DESC LIMIT 1",
                 (service_id,)
             ).fetchone()
             return dict(row) if row else None
-        finally:
-            conn.close()
 
-    def get_probe_runs(self, service_id):
-        conn = self._connect()
-        try:
-            rows = conn.execute(
-                "SELECT * FROM probe_runs WHERE service_id = ? ORDER BY id DESC",
-                (service_id,)
-            ).fetchall()
+    def get_probe_runs(self, service_id, limit=None):
+        """Probe-Runs eines Services, neueste zuerst (optional nur die letzten limit)."""
+        self._flush_probe_runs()
+        sql = "SELECT * FROM probe_runs WHERE service_id = ? ORDER BY id DESC"
+        params = (service_id,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        with self._read_conn() as conn:
+            rows = conn.execute(sql, params).fetchall()
             return [dict(r) for r in rows]
-        finally:
-            conn.close()
+
+    def count_probe_runs(self, service_id):
+        """Anzahl Probe-Runs eines Services (ohne die Zeilen zu laden)."""
+        # Runs werden sofort eingefuegt, nur Updates sind gepuffert
+        with self._read_conn() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM probe_runs WHERE service_id = ?",
+                (service_id,)
+            ).fetchone()[0]
+
+    # ── OpenAPI-Cache ─────────────────────────────────────────────────────
+
+    def get_openapi_cache(self, digest):
+        """Gecachte Endpoint-Liste zu einem Spec-Hash (oder None)."""
+        with self._read_conn() as conn:
+            row = conn.execute(
+                "SELECT endpoints_json FROM openapi_cache WHERE digest = ?",
+                (digest,)
+            ).fetchone()
+        return json.loads(row["endpoints_json"]) if row else None
+
+    def put_openapi_cache(self, digest, endpoints):
+        """Endpoint-Liste aus extract_endpoints_from_spec unter dem Spec-Hash speichern."""
+        with self._write_conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO openapi_cache (digest, endpoints_json, parsed_at) "
+                "VALUES (?, ?, ?)",
+                (digest, _dumps(endpoints), datetime.utcnow().isoformat())
+            )
 
     # ── Statistiken ───────────────────────────────────────────────────────
 
     def get_service_stats(self, service_id):
-        """Statistiken fuer einen Service."""
-        conn = self._connect()
-        try:
-            ep_count = conn.execute(
-                "SELECT COUNT(*) as c FROM endpoints WHERE service_id = ?",
-                (service_id,)
-            ).fetchone()["c"]
-            resp_count = conn.execute(
-                "SELECT COUNT(*) as c FROM responses r "
-                "JOIN endpoints e ON r.endpoint_id = e.id "
-                "WHERE e.service_id = ?",
-                (service_id,)
-            ).fetchone()["c"]
-            param_count = conn.execute(
-                "SELECT COUNT(*) as c FROM parameters p "
-                "JOIN endpoints e ON p.endpoint_id = e.id "
-                "WHERE e.service_id = ?",
-                (service_id,)
-            ).fetchone()["c"]
-            return {
-                "endpoints": ep_count,
-                "responses": resp_count,
-                "parameters": param_count
-            }
-        finally:
-            conn.close()
+        """Statistiken fuer einen Service (eine Query statt drei)."""
+        with self._read_conn() as conn:
+            row = conn.execute("""
+                WITH eps AS (SELECT id FROM endpoints WHERE service_id = ?)
+                SELECT
+                    (SELECT COUNT(*) FROM eps) AS endpoints,
+                    (SELECT COUNT(*) FROM responses
+                     WHERE endpoint_id IN (SELECT id FROM eps)) AS responses,
+                    (SELECT COUNT(*) FROM parameters
+                     WHERE endpoint_id IN (SELECT id FROM eps)) AS parameters
+            """, (service_id,)).fetchone()
+            return dict(row)
+
+
+def _group_by_endpoint(rows):
+    """Rows (nach endpoint_id sortiert) als {endpoint_id: [dict, ...]}."""
+    groups = {}
+    for r in rows:
+        groups.setdefault(r["endpoint_id"], []).append(dict(r))
+    return groups
+
+
+def _endpoint_dict(row):
+    """Endpoint-Row als dict, die JSON-Listen zusaetzlich dekodiert als Tupel.
+
+    Neue Keys: "methods", "status_codes", "content_types".
+    """
+    ep = dict(row)
+    ep["methods"] = _decode_json_list(ep["methods_json"])
+    ep["status_codes"] = _decode_json_list(ep["status_codes_json"])
+    ep["content_types"] = _decode_json_list(ep["content_types_json"])
+    return ep
+
+
+@functools.lru_cache(maxsize=1024)
+def _decode_json_list(text):
+    """JSON-Array-Spalte als (geteiltes, unveraenderliches) Tupel.
+
+    Die Listen werden sortiert und kompakt gespeichert, gleiche Mengen haben
+    also denselben Text; ueber viele Endpoints wiederholen sie sich stark,
+    daher wird pro eindeutigem Wert nur einmal geparst.
+    """
+    return tuple(json.loads(text or "[]"))
+
+
+def _response_params(endpoint_id, method, status_code, headers, body_schema,
+                     body_sample, content_type, elapsed_ms, truncated=False,
+                     links=None):
+    """Bind-Parameter fuer _INSERT_RESPONSE_SQL (body_sample auf 2KB beschraenkt).
+
+    headers darf ein dict oder eine HTTPMessage sein; erst hier wird es zum dict.
+
+    Aufrufer uebergeben den vollen Body; gekuerzt wird nur hier und nur bei Bedarf.
+    """
+    if len(body_sample) > _BODY_SAMPLE_CHARS:
+        body_sample = body_sample[:_BODY_SAMPLE_CHARS]
+    return (
+        endpoint_id, method, status_code,
+        _dumps(dict(headers) if headers else {}),
+        _dumps(body_schema or {}),
+        body_sample, content_type, elapsed_ms, int(bool(truncated)),
+        _dumps(links) if links is not None else None
+    )
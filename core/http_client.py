@@ -1,10 +1,12 @@
 """
 ApiProber.core.http_client -- HTTP-Client mit Rate-Limiting
 =============================================================
-urllib.request Wrapper mit Auth, Rate-Limiting, User-Agent.
+http.client mit Keep-Alive-Pool, Auth, Rate-Limiting, User-Agent.
 Pattern: BACH connectors/base.py (dataclass, UA, Retry)
 """
+import http.client
 import json
+import threading
 import time
 import ssl
 import urllib.request
@@ -13,6 +15,16 @@ import urllib.parse
 from dataclasses import dataclass, field
 from typing import Optional
 
+# Ein TLS-Kontext fuer alle Clients: CA-Bundle wird nur einmal geladen.
+# Mindestens TLS 1.2, ALPN nur http/1.1 (http.client spricht kein HTTP/2).
+SSL_CONTEXT = ssl.create_default_context()
+SSL_CONTEXT.minimum_version = ssl.TLSVersion.TLSv1_2
+SSL_CONTEXT.set_alpn_protocols(["http/1.1"])
+
+# Wie urllib.request.HTTPRedirectHandler
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+_MAX_REDIRECTS = 10
+
 
 @dataclass
 class HttpResponse:
@@ -20,12 +32,15 @@ class HttpResponse:
     url: str
     method: str
     status_code: int
+    # http.client.HTTPMessage (case-insensitiv, dict-artig) oder leeres dict
     headers: dict = field(default_factory=dict)
     body: str = ""
     content_type: str = ""
     elapsed_ms: int = 0
     error: str = ""
     is_json: bool = False
+    # Body nach max_body_bytes abgeschnitten
+    truncated: bool = False
 
     @property
     def ok(self):
@@ -46,16 +61,33 @@ class HttpClient:
         self.user_agent = config.get("user_agent", "ApiProber/0.1")
         self.auth_type = config.get("auth", {}).get("type", "none")
         self.auth_value = config.get("auth", {}).get("value", "")
-        self._last_request_time = 0.0
+        self.rate_burst = max(1, int(config.get("rate_burst", 1)))
+        # Obergrenze fuer gelesene Body-Bytes (0 = unbegrenzt)
+        self.max_body_bytes = max(0, int(config.get("max_body_bytes", 0) or 0))
+        # Token-Bucket in Nanosekunden (None = noch kein Request)
+        self._tokens_ns = 0
+        self._last_ns = None
+        self._rate_lock = threading.Lock()
         self._request_count = 0
-        self._ssl_ctx = ssl.create_default_context()
+        self._ssl_ctx = SSL_CONTEXT
+        # Keep-Alive-Pool: (scheme, host:port) -> freie Verbindungen
+        self._pool = {}
+        self._pool_lock = threading.Lock()
+        self._proxies = urllib.request.getproxies()
+        # (scheme, host) von Servern, die HEAD generell mit 405 ablehnen
+        self._no_head_hosts = set()
 
     @property
     def request_count(self):
         return self._request_count
 
-    def request(self, url, method="GET", body=None, extra_headers=None):
-        """HTTP-Request mit Rate-Limiting. Gibt HttpResponse zurueck."""
+    def request(self, url, method="GET", body=None, extra_headers=None,
+                max_bytes=None):
+        """HTTP-Request mit Rate-Limiting. Gibt HttpResponse zurueck.
+
+        max_bytes ersetzt max_body_bytes fuer diesen Request (0 = unbegrenzt).
+        """
+        limit = self.max_body_bytes if max_bytes is None else max(0, int(max_bytes))
         self._rate_limit()
 
         headers = {
@@ -86,88 +118,233 @@ class HttpClient:
             elif isinstance(body, bytes):
                 data = body
 
-        req = urllib.request.Request(url, data=data, headers=headers, method=method)
-
         start = time.monotonic()
-        self._request_count += 1
+        with self._rate_lock:
+            self._request_count += 1
 
         try:
-            with urllib.request.urlopen(req, timeout=self.timeout,
-                                        context=self._ssl_ctx) as resp:
-                elapsed = int((time.monotonic() - start) * 1000)
-                resp_headers = dict(resp.headers)
-                content_type = resp_headers.get("Content-Type", "")
-                raw_body = resp.read()
-
-                # Body decodieren
-                body_str = ""
-                try:
-                    body_str = raw_body.decode("utf-8")
-                except UnicodeDecodeError:
-                    body_str = raw_body.decode("latin-1", errors="replace")
-
-                is_json = "json" in content_type.lower()
-
-                return HttpResponse(
-                    url=url, method=method,
-                    status_code=resp.status,
-                    headers=resp_headers,
-                    body=body_str,
-                    content_type=content_type,
-                    elapsed_ms=elapsed,
-                    is_json=is_json
-                )
-        except urllib.error.HTTPError as e:
-            elapsed = int((time.monotonic() - start) * 1000)
-            resp_headers = dict(e.headers) if e.headers else {}
-            content_type = resp_headers.get("Content-Type", "")
-            body_str = ""
-            try:
-                raw = e.read()
-                body_str = raw.decode("utf-8", errors="replace")
-            except Exception:
-                pass
-            return HttpResponse(
-                url=url, method=method,
-                status_code=e.code,
-                headers=resp_headers,
-                body=body_str,
-                content_type=content_type,
-                elapsed_ms=elapsed,
-                error=str(e),
-                is_json="json" in content_type.lower()
+            status, reason, resp_headers, raw_body, truncated, elapsed = self._send(
+                url, method, data, headers, start, limit
             )
-        except urllib.error.URLError as e:
+        except Exception as e:
             elapsed = int((time.monotonic() - start) * 1000)
+            if isinstance(e, urllib.error.URLError):
+                e = e.reason
             return HttpResponse(
                 url=url, method=method,
                 status_code=0,
                 elapsed_ms=elapsed,
-                error=str(e.reason)
+                error=str(e)
             )
-        except Exception as e:
-            elapsed = int((time.monotonic() - start) * 1000)
+
+        content_type = resp_headers.get("Content-Type", "")
+        is_json = "json" in content_type.lower()
+
+        if 200 <= status < 300:
+            # Body decodieren
+            try:
+                body_str = raw_body.decode("utf-8")
+            except UnicodeDecodeError:
+                if truncated:
+                    # Vermutlich nur ein angeschnittenes Multibyte-Zeichen
+                    body_str = raw_body.decode("utf-8", errors="replace")
+                else:
+                    body_str = raw_body.decode("latin-1", errors="replace")
             return HttpResponse(
                 url=url, method=method,
-                status_code=0,
+                status_code=status,
+                headers=resp_headers,
+                body=body_str,
+                content_type=content_type,
                 elapsed_ms=elapsed,
-                error=str(e)
+                is_json=is_json,
+                truncated=truncated
+            )
+
+        # Wie urllib: alles ausser 2xx gilt als HTTP-Fehler
+        return HttpResponse(
+            url=url, method=method,
+            status_code=status,
+            headers=resp_headers,
+            body=raw_body.decode("utf-8", errors="replace"),
+            content_type=content_type,
+            elapsed_ms=elapsed,
+            error=f"HTTP Error {status}: {reason}",
+            is_json=is_json,
+            truncated=truncated
+        )
+
+    def close(self):
+        """Alle offenen Keep-Alive-Verbindungen schliessen."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, {}
+        for conns in pool.values():
+            for conn in conns:
+                conn.close()
+
+    def _send(self, url, method, data, headers, start, limit):
+        """Request senden, Redirects folgen wie urllib.
+
+        Returns:
+            tuple: (status, reason, headers, raw_body, truncated, elapsed_ms)
+        """
+        if data is not None and not any(k.lower() == "content-type" for k in headers):
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        for _ in range(_MAX_REDIRECTS + 1):
+            parts = urllib.parse.urlsplit(url)
+            if self._proxies and self._uses_proxy(parts):
+                return self._send_urllib(url, method, data, headers, start, limit)
+
+            status, reason, resp_headers, raw_body, truncated = self._exchange(
+                parts, method, data, headers, limit
             )
+            elapsed = int((time.monotonic() - start) * 1000)
+
+            location = resp_headers.get("Location") or resp_headers.get("URI")
+            if status not in _REDIRECT_CODES or not location:
+                break
+            # Redirect-Regeln von urllib.request.HTTPRedirectHandler
+            if method in ("GET", "HEAD"):
+                pass
+            elif method == "POST" and status in (301, 302, 303):
+                method = "GET"
+            else:
+                break
+            new_url = urllib.parse.urljoin(url, location)
+            if urllib.parse.urlsplit(new_url).scheme not in ("http", "https"):
+                break
+            url = new_url
+            data = None
+            headers = {k: v for k, v in headers.items()
+                       if k.lower() not in ("content-length", "content-type")}
+
+        return status, reason, resp_headers, raw_body, truncated, elapsed
+
+    def _exchange(self, parts, method, data, headers, limit):
+        """Ein Request/Response-Paar ueber eine gepoolte Verbindung."""
+        key = (parts.scheme, parts.netloc.rpartition("@")[2])
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+
+        conn, reused = self._acquire(key)
+        try:
+            try:
+                conn.request(method, target, body=data, headers=headers)
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError,
+                    BrokenPipeError):
+                # Vom Server geschlossene Keep-Alive-Verbindung: einmal neu
+                if not reused:
+                    raise
+                conn.close()
+                conn.request(method, target, body=data, headers=headers)
+                resp = conn.getresponse()
+            raw_body, truncated = _read_body(resp, limit)
+        except BaseException:
+            conn.close()
+            raise
+
+        if resp.will_close or truncated:
+            # Nicht fertig gelesene Responses machen die Verbindung unbrauchbar
+            conn.close()
+        else:
+            self._release(key, conn)
+        return resp.status, resp.reason, resp.headers, raw_body, truncated
+
+    def _acquire(self, key):
+        """Freie Verbindung zu (scheme, host) holen oder neu anlegen."""
+        with self._pool_lock:
+            conns = self._pool.get(key)
+            if conns:
+                return conns.pop(), True
+        scheme, host = key
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, timeout=self.timeout,
+                                               context=self._ssl_ctx)
+        elif scheme == "http":
+            conn = http.client.HTTPConnection(host, timeout=self.timeout)
+        else:
+            raise urllib.error.URLError(f"unknown url type: {scheme}")
+        return conn, False
+
+    def _release(self, key, conn):
+        with self._pool_lock:
+            self._pool.setdefault(key, []).append(conn)
+
+    def _uses_proxy(self, parts):
+        return (parts.scheme in self._proxies
+                and not urllib.request.proxy_bypass(parts.hostname or ""))
+
+    def _send_urllib(self, url, method, data, headers, start, limit):
+        """Fallback ueber urllib, wenn ein HTTP(S)-Proxy konfiguriert ist."""
+        req = urllib.request.Request(url, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout,
+                                        context=self._ssl_ctx) as resp:
+                elapsed = int((time.monotonic() - start) * 1000)
+                raw, truncated = _read_body(resp, limit)
+                return resp.status, resp.reason, resp.headers, raw, truncated, elapsed
+        except urllib.error.HTTPError as e:
+            elapsed = int((time.monotonic() - start) * 1000)
+            try:
+                raw, truncated = _read_body(e, limit)
+            except Exception:
+                raw, truncated = b"", False
+            return (e.code, e.reason, e.headers if e.headers is not None else {},
+                    raw, truncated, elapsed)
 
     def head(self, url):
         return self.request(url, method="HEAD")
 
-    def get(self, url):
-        return self.request(url, method="GET")
+    def head_supported(self, url):
+        """False, wenn der Host HEAD bereits als nicht unterstuetzt gemeldet hat."""
+        return _host_key(url) not in self._no_head_hosts
+
+    def mark_head_unsupported(self, url):
+        """Host fuer den Rest der Session nur noch per GET testen."""
+        self._no_head_hosts.add(_host_key(url))
+
+    def get(self, url, max_bytes=None):
+        return self.request(url, method="GET", max_bytes=max_bytes)
 
     def options(self, url):
         return self.request(url, method="OPTIONS")
 
     def _rate_limit(self):
-        """Wartet bis delay_ms seit letztem Request vergangen sind."""
-        if self._last_request_time > 0:
-            elapsed = (time.monotonic() - self._last_request_time) * 1000
-            remaining = self.delay_ms - elapsed
-            if remaining > 0:
-                time.sleep(remaining / 1000.0)
-        self._last_request_time = time.monotonic()
+        """Token-Bucket: im Mittel ein Request pro delay_ms, Bursts bis rate_burst.
+
+        Mit rate_burst=1 (Default) entspricht das festen Abstaenden von delay_ms.
+        Der Slot wird unter dem Lock reserviert, geschlafen wird ausserhalb.
+        """
+        interval_ns = int(self.delay_ms * 1_000_000)
+        if interval_ns <= 0:
+            return
+        capacity_ns = interval_ns * self.rate_burst
+        with self._rate_lock:
+            now_ns = time.monotonic_ns()
+            if self._last_ns is None:
+                tokens_ns = capacity_ns
+            else:
+                tokens_ns = min(self._tokens_ns + now_ns - self._last_ns, capacity_ns)
+            tokens_ns -= interval_ns
+            self._tokens_ns = tokens_ns
+            self._last_ns = now_ns
+        if tokens_ns < 0:
+            time.sleep(-tokens_ns / 1e9)
+
+
+def _host_key(url):
+    parts = urllib.parse.urlsplit(url)
+    return parts.scheme, parts.netloc.rpartition("@")[2]
+
+
+def _read_body(resp, limit):
+    """Body lesen, hoechstens limit Bytes (0 = alles). Gibt (raw_body, truncated) zurueck."""
+    if not limit:
+        return resp.read(), False
+    raw_body = resp.read(limit + 1)
+    if len(raw_body) > limit:
+        return raw_body[:limit], True
+    return raw_body, False
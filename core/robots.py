@@ -3,10 +3,19 @@ ApiProber.core.robots -- robots.txt Respektierung
 ===================================================
 Nutzt urllib.robotparser fuer Zugriffskontrolle.
 """
+import functools
+import re
+import urllib.parse
 import urllib.robotparser
 import urllib.request
 import urllib.error
 
+from .http_client import SSL_CONTEXT
+
+# Pfade, die urllib.parse.quote() unveraendert laesst und die keine
+# Query/Params/Fragmente enthalten: dafuer greift der kompilierte Matcher
+_PLAIN_PATH_RE = re.compile(r"[A-Za-z0-9_.\-~/]*")
+
 
 class RobotsChecker:
     """Prueft robots.txt Regeln fuer eine Base-URL."""
@@ -14,32 +23,41 @@ class RobotsChecker:
     def __init__(self, base_url, user_agent="ApiProber/0.1"):
         self.base_url = base_url.rstrip("/")
         self.user_agent = user_agent
-        self._parser = urllib.robotparser.RobotFileParser()
+        self._parser = None
+        self._rules = True
+        self._base_path = None
         self._loaded = False
         self._raw_text = ""
 
     def load(self):
-        """robots.txt laden und parsen. Gibt (success, raw_text) zurueck."""
-        robots_url = f"{self.base_url}/robots.txt"
-        try:
-            req = urllib.request.Request(robots_url)
-            req.add_header("User-Agent", self.user_agent)
-            with urllib.request.urlopen(req, timeout=10) as resp:
-                self._raw_text = resp.read().decode("utf-8", errors="replace")
-            self._parser.parse(self._raw_text.splitlines())
-            self._loaded = True
-            return True, self._raw_text
-        except (urllib.error.URLError, urllib.error.HTTPError, Exception):
-            # Kein robots.txt = alles erlaubt
-            # parse([]) setzt mtime(), damit can_fetch() True liefert
-            self._parser.parse([])
-            self._loaded = True
-            return False, ""
+        """robots.txt laden und parsen. Gibt (success, raw_text) zurueck.
+
+        Der Parser wird pro (robots-URL, User-Agent) prozessweit geteilt.
+        """
+        self._parser, self._raw_text, success, self._rules = _fetch_robots(
+            f"{self.base_url}/robots.txt", self.user_agent
+        )
+        base_path = urllib.parse.urlsplit(self.base_url).path
+        self._base_path = base_path if _PLAIN_PATH_RE.fullmatch(base_path) else None
+        self._loaded = True
+        return success, self._raw_text
 
     def is_allowed(self, path):
-        """Prueft ob ein Pfad erlaubt ist."""
+        """Prueft ob ein Pfad erlaubt ist.
+
+        Einfache Pfade laufen ueber den vorkompilierten Matcher (ein
+        Regex-Match statt Schleife ueber alle Regeln), alles andere ueber
+        RobotFileParser.can_fetch().
+        """
         if not self._loaded:
             self.load()
+        rules = self._rules
+        if rules is True or rules is False:
+            return rules
+        if self._base_path is not None and _PLAIN_PATH_RE.fullmatch(path):
+            pattern, allowances = rules
+            match = pattern.match(self._base_path + path or "/")
+            return allowances[match.lastindex - 1] if match else True
         full_url = f"{self.base_url}{path}"
         return self._parser.can_fetch(self.user_agent, full_url)
 
@@ -57,3 +75,68 @@ class RobotsChecker:
             return delay
         except Exception:
             return None
+
+
+def _fetch_robots(robots_url, user_agent):
+    """Laedt und parst robots.txt. Gibt (parser, raw_text, success, rules) zurueck.
+
+    Das Ergebnis wird geteilt und darf nicht veraendert werden. Gecacht
+    werden nur eindeutige Antworten; nach Timeouts, Verbindungs- und
+    Serverfehlern versucht es der naechste Checker erneut.
+    """
+    try:
+        return _fetch_robots_cached(robots_url, user_agent)
+    except Exception:
+        # Nicht erreichbar = alles erlaubt, aber nur fuer diesen Checker
+        return _allow_all()
+
+
+@functools.lru_cache(maxsize=256)
+def _fetch_robots_cached(robots_url, user_agent):
+    """Wie _fetch_robots; voruebergehende Fehler werden als Exception weitergereicht."""
+    try:
+        req = urllib.request.Request(robots_url)
+        req.add_header("User-Agent", user_agent)
+        with urllib.request.urlopen(req, timeout=10, context=SSL_CONTEXT) as resp:
+            raw_text = resp.read().decode("utf-8", errors="replace")
+    except urllib.error.HTTPError as e:
+        if e.code >= 500 or e.code == 429:
+            raise
+        # Eindeutige Antwort (z.B. 404): kein robots.txt = alles erlaubt
+        return _allow_all()
+    parser = urllib.robotparser.RobotFileParser()
+    parser.parse(raw_text.splitlines())
+    return parser, raw_text, True, _compile_rules(parser, user_agent)
+
+
+def _allow_all():
+    """Ergebnis fuer fehlendes robots.txt."""
+    parser = urllib.robotparser.RobotFileParser()
+    # parse([]) setzt mtime(), damit can_fetch() True liefert
+    parser.parse([])
+    return parser, "", False, True
+
+
+def _compile_rules(parser, user_agent):
+    """Regeln des passenden Eintrags als eine Regex-Alternation kompilieren.
+
+    Wie RobotFileParser.can_fetch() gilt die erste passende Regel in
+    Datei-Reihenfolge; die Regex-Alternation probiert ihre Zweige in genau
+    dieser Reihenfolge, m.lastindex liefert die Regel.
+
+    Returns:
+        True/False wenn alles erlaubt/verboten ist, sonst (pattern, allowances)
+    """
+    if parser.disallow_all:
+        return False
+    if parser.allow_all:
+        return True
+    entry = next((e for e in parser.entries if e.applies_to(user_agent)),
+                 parser.default_entry)
+    if entry is None or not entry.rulelines:
+        return True
+    pattern = re.compile("|".join(
+        "()" if line.path == "*" else f"({re.escape(line.path)})"
+        for line in entry.rulelines
+    ))
+    return pattern, tuple(line.allowance for line in entry.rulelines)
@@ -4,54 +4,128 @@ ApiProber.core.schema_extractor -- JSON-Schema aus Responses ableiten
 Analysiert Response-Bodies und generiert ein kompaktes JSON-Schema.
 """
 import json
+import re
+
+# Ab dieser Body-Groesse (Zeichen) werden Top-Level-Arrays elementweise geparst
+_STREAM_MIN_CHARS = 64 * 1024
+
+_DECODER = json.JSONDecoder()
+_WS = json.decoder.WHITESPACE
+
+# Obergrenze besuchter Knoten in extract_links_from_json
+_MAX_LINK_NODES = 10_000
+
+# Patterns fuer Parameter-Hinweise in Error-Messages, als eine Alternation
+# vorkompiliert: ein Durchlauf ueber den Body statt vier
+_PARAM_HINT_PATTERNS = (
+    r"(?:missing|required)\s+(?:field|param(?:eter)?)[:\s]+['\"]?(\w+)['\"]?",
+    r"['\"](\w+)['\"]\s+(?:is|are)\s+required",
+    r"(?:field|param(?:eter)?)\s+['\"](\w+)['\"]\s+(?:is\s+)?(?:missing|required)",
+    r"expected\s+['\"](\w+)['\"]",
+)
+_PARAM_HINT_RE = re.compile(
+    "|".join(f"(?:{p})" for p in _PARAM_HINT_PATTERNS), re.IGNORECASE
+)
 
 
 def extract_schema(data):
     """Leitet ein JSON-Schema aus einem Python-Objekt ab.
 
+    Iterativ mit explizitem Stack: keine Rekursion, daher auch bei
+    tief verschachteltem JSON kein RecursionError.
+
     Args:
         data: Parsed JSON (dict, list, str, int, float, bool, None)
 
     Returns:
         dict: Kompaktes JSON-Schema-aehnliches Objekt
     """
-    if data is None:
-        return {"type": "null"}
-    elif isinstance(data, bool):
-        return {"type": "boolean"}
-    elif isinstance(data, int):
-        return {"type": "integer"}
-    elif isinstance(data, float):
-        return {"type": "number"}
-    elif isinstance(data, str):
-        schema = {"type": "string"}
-        if len(data) > 0:
-            schema["example_length"] = len(data)
-        return schema
-    elif isinstance(data, list):
-        schema = {"type": "array", "length": len(data)}
-        if len(data) > 0:
-            # Schema des ersten Elements als Repraesentation
-            schema["items"] = extract_schema(data[0])
-        return schema
-    elif isinstance(data, dict):
-        properties = {}
-        for key, value in data.items():
-            properties[key] = extract_schema(value)
-        return {
-            "type": "object",
-            "properties": properties,
-            "field_count": len(properties)
-        }
-    else:
-        return {"type": "unknown"}
+    root = {}
+    # (Wert, Ziel-dict, Ziel-Key): Schema von Wert wird in Ziel[Key] eingetragen
+    stack = [(data, root, "schema")]
+    while stack:
+        value, target, key = stack.pop()
+        handler = _SCHEMA_HANDLERS.get(type(value)) or _subclass_handler(value)
+        target[key] = handler(value, stack)
+    return root["schema"]
+
+
+def _schema_null(value, stack):
+    return {"type": "null"}
+
+
+def _schema_boolean(value, stack):
+    return {"type": "boolean"}
+
+
+def _schema_integer(value, stack):
+    return {"type": "integer"}
+
+
+def _schema_number(value, stack):
+    return {"type": "number"}
+
+
+def _schema_string(value, stack):
+    schema = {"type": "string"}
+    if len(value) > 0:
+        schema["example_length"] = len(value)
+    return schema
+
+
+def _schema_array(value, stack):
+    schema = {"type": "array", "length": len(value)}
+    if len(value) > 0:
+        # Schema des ersten Elements als Repraesentation
+        stack.append((value[0], schema, "items"))
+    return schema
+
+
+def _schema_object(value, stack):
+    # Keys vorab eintragen, damit die Reihenfolge erhalten bleibt
+    properties = dict.fromkeys(value)
+    for prop_key, prop_value in value.items():
+        stack.append((prop_value, properties, prop_key))
+    return {
+        "type": "object",
+        "properties": properties,
+        "field_count": len(properties)
+    }
+
+
+def _schema_unknown(value, stack):
+    return {"type": "unknown"}
 
 
-def extract_schema_from_body(body_str):
+# Dispatch ueber den exakten Typ: ein Hash-Lookup statt isinstance-Kette.
+# type(True) ist bool, daher keine Verwechslung mit int.
+_SCHEMA_HANDLERS = {
+    type(None): _schema_null,
+    bool: _schema_boolean,
+    int: _schema_integer,
+    float: _schema_number,
+    str: _schema_string,
+    list: _schema_array,
+    dict: _schema_object,
+}
+
+
+def _subclass_handler(value):
+    """Handler fuer Unterklassen (z.B. OrderedDict), die json.loads nie liefert."""
+    for base, handler in _SCHEMA_HANDLERS.items():
+        if isinstance(value, base):
+            return handler
+    return _schema_unknown
+
+
+def extract_schema_from_body(body_str, truncated=False):
     """Versucht JSON-Schema aus einem Response-Body zu extrahieren.
 
     Args:
         body_str: Raw response body als String
+        truncated: Body ist abgeschnitten; ausgewertet wird dann der
+            vollstaendige Anfang (siehe decode_truncated_json), das Schema
+            traegt "truncated"
 
     Returns:
         dict: Schema oder leeres dict bei Fehler
@@ -59,15 +133,121 @@ def extract_schema_from_body(body_str):
     if not body_str or not body_str.strip():
         return {}
     try:
+        if truncated:
+            schema = extract_schema(decode_truncated_json(body_str))
+            schema["truncated"] = True
+            return schema
+        if len(body_str) >= _STREAM_MIN_CHARS:
+            start = _WS.match(body_str).end()
+            if body_str.startswith("[", start):
+                return _array_schema_streaming(body_str, start + 1)
         data = json.loads(body_str)
         return extract_schema(data)
-    except (json.JSONDecodeError, ValueError):
+    except (json.JSONDecodeError, ValueError, RecursionError):
         return {}
 
 
+def decode_truncated_json(body_str):
+    """Parst den vollstaendigen Anfang eines abgeschnittenen JSON-Bodys.
+
+    Objekte und Arrays enden nach dem letzten vollstaendigen Wert. Ist der
+    angeschnittene letzte Wert selbst Objekt oder Array (z.B. "data" in
+    {"data": [...], "meta": ...}), wird er ebenso geborgen, sonst verworfen.
+
+    Raises:
+        json.JSONDecodeError: Wenn der Body nicht mit Objekt/Array beginnt
+            und auch kein vollstaendiger JSON-Wert ist
+    """
+    value, _ = _decode_prefix(body_str, _WS.match(body_str).end())
+    return value
+
+
+def _decode_prefix(body_str, idx):
+    """(Wert, Ende) ab idx; Objekte/Arrays duerfen am Body-Ende abbrechen."""
+    try:
+        return _DECODER.raw_decode(body_str, idx)
+    except json.JSONDecodeError:
+        opener = body_str[idx:idx + 1]
+        if opener not in ("{", "["):
+            raise
+    is_object = opener == "{"
+    closer = "}" if is_object else "]"
+    container = {} if is_object else []
+    end = len(body_str)
+    idx += 1
+    while True:
+        idx = _WS.match(body_str, idx).end()
+        if body_str.startswith(closer, idx):
+            return container, idx + 1
+        try:
+            if is_object:
+                key, idx = _DECODER.raw_decode(body_str, idx)
+                idx = _WS.match(body_str, idx).end()
+                if not isinstance(key, str) or not body_str.startswith(":", idx):
+                    return container, end
+                idx = _WS.match(body_str, idx + 1).end()
+            value, idx = _decode_prefix(body_str, idx)
+        except json.JSONDecodeError:
+            return container, end
+        if is_object:
+            container[key] = value
+        else:
+            container.append(value)
+        idx = _WS.match(body_str, idx).end()
+        sep = body_str[idx:idx + 1]
+        if sep == closer:
+            return container, idx + 1
+        if sep != ",":
+            return container, end
+        idx += 1
+
+
+def _array_schema_streaming(body_str, idx):
+    """Schema eines grossen Top-Level-Arrays, Element fuer Element geparst.
+
+    Nur das erste Element bleibt im Speicher (mehr braucht extract_schema
+    nicht), alle weiteren werden nur gezaehlt und sofort verworfen.
+
+    Raises:
+        json.JSONDecodeError: Bei ungueltigem JSON (wie json.loads)
+    """
+    first = None
+    length = 0
+    idx = _WS.match(body_str, idx).end()
+    if body_str.startswith("]", idx):
+        idx += 1
+    else:
+        while True:
+            value, idx = _DECODER.raw_decode(body_str, idx)
+            if length == 0:
+                first = value
+            length += 1
+            sep = body_str[idx:idx + 1]
+            if sep.isspace():
+                idx = _WS.match(body_str, idx).end()
+                sep = body_str[idx:idx + 1]
+            idx += 1
+            if sep == "]":
+                break
+            if sep != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", body_str, idx - 1)
+            if body_str[idx:idx + 1].isspace():
+                idx = _WS.match(body_str, idx).end()
+    if _WS.match(body_str, idx).end() != len(body_str):
+        raise json.JSONDecodeError("Extra data", body_str, idx)
+
+    schema = {"type": "array", "length": length}
+    if length > 0:
+        schema["items"] = extract_schema(first)
+    return schema
+
+
 def extract_links_from_json(data, base_url=""):
     """Extrahiert URL-aehnliche Werte aus einem JSON-Objekt (HATEOAS).
 
+    Iterativ; jeder Container wird hoechstens einmal besucht. HATEOAS-Keys
+    (href, url, _links, ...) werden ueber die Werte automatisch erreicht.
+
     Args:
         data: Parsed JSON
         base_url: Basis-URL fuer relative Pfade
@@ -76,37 +256,31 @@ def extract_links_from_json(data, base_url=""):
         set: Gefundene URLs/Pfade
     """
     links = set()
-    _walk_for_links(data, links, base_url)
+    stack = [data]
+    seen = set()
+    visited = 0
+    while stack and visited < _MAX_LINK_NODES:
+        node = stack.pop()
+        visited += 1
+        if isinstance(node, str):
+            # Absolute URLs
+            if node.startswith(("http://", "https://")):
+                if base_url and node.startswith(base_url):
+                    links.add(node)
+            # Relative API-Pfade
+            elif node.startswith("/") and not node.startswith("//"):
+                links.add(node)
+        elif isinstance(node, (dict, list)):
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if isinstance(node, dict):
+                stack.extend(node.values())
+            else:
+                stack.extend(node[:50])  # Max 50 Elemente traversieren
     return links
 
 
-def _walk_for_links(data, links, base_url):
-    """Rekursiv nach URLs in JSON suchen."""
-    if isinstance(data, str):
-        # Absolute URLs
-        if data.startswith("http://") or data.startswith("https://"):
-            if base_url and data.startswith(base_url):
-                links.add(data)
-        # Relative API-Pfade
-        elif data.startswith("/") and not data.startswith("//"):
-            links.add(data)
-    elif isinstance(data, dict):
-        # HATEOAS-typische Keys
-        for key in ("href", "url", "link", "self", "next", "prev",
-                     "first", "last", "related"):
-            if key in data:
-                _walk_for_links(data[key], links, base_url)
-        # _links Objekt (HAL)
-        if "_links" in data:
-            _walk_for_links(data["_links"], links, base_url)
-        # Alle Werte rekursiv
-        for value in data.values():
-            _walk_for_links(value, links, base_url)
-    elif isinstance(data, list):
-        for item in data[:50]:  # Max 50 Elemente traversieren
-            _walk_for_links(item, links, base_url)
-
-
 def extract_params_from_error(body_str):
     """Versucht Parameter-Hinweise aus Fehlermeldungen zu extrahieren.
 
@@ -120,20 +294,9 @@ def extract_params_from_error(body_str):
     if not body_str:
         return params
 
-    import re
-
-    # Patterns fuer Parameter-Hinweise in Error-Messages
-    patterns = [
-        r"(?:missing|required)\s+(?:field|param(?:eter)?)[:\s]+['\"]?(\w+)['\"]?",
-        r"['\"](\w+)['\"]\s+(?:is|are)\s+required",
-        r"(?:field|param(?:eter)?)\s+['\"](\w+)['\"]\s+(?:is\s+)?(?:missing|required)",
-        r"expected\s+['\"](\w+)['\"]",
-    ]
-
-    for pattern in patterns:
-        matches = re.findall(pattern, body_str, re.IGNORECASE)
-        for match in matches:
-            if match and len(match) > 1:
-                params.append((match, True))
+    for match in _PARAM_HINT_RE.finditer(body_str):
+        name = match.group(match.lastindex)
+        if len(name) > 1:
+            params.append((name, True))
 
     return params
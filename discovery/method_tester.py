@@ -9,19 +9,28 @@ SAFE_METHODS = ["GET", "HEAD", "OPTIONS"]
 ALL_METHODS = ["GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"]
 
 
-def test_methods(client, base_url, path, skip_destructive=True):
+def test_methods(client, base_url, path, skip_destructive=True,
+                 trust_allow_header=True):
     """Testet alle HTTP-Methoden fuer einen Endpoint.
 
+    OPTIONS wird zuerst gesendet. Liefert es einen Allow-Header und ist
+    trust_allow_header gesetzt, werden die uebrigen Methoden nicht mehr
+    einzeln getestet. Nach einer 401/403 mit WWW-Authenticate werden die
+    uebrigen sicheren Methoden nicht mehr gesendet (sie liefern dieselbe
+    Auth-Antwort) und ohne Status-Code als unterstuetzt gewertet; andere
+    Methoden werden weiter echt getestet (oft 405 vor der Auth-Pruefung).
+
     Args:
         client: HttpClient Instanz
         base_url: Basis-URL
         path: Endpoint-Pfad
         skip_destructive: True = nur GET/HEAD/OPTIONS
+        trust_allow_header: Allow-Header von OPTIONS als vollstaendig ansehen
 
     Returns:
         dict: {
             "methods": [str],           # Unterstuetzte Methoden
-            "status_codes": {str: int},  # Methode -> Status
+            "status_codes": {str: int},  # Methode -> Status (nur gesendete)
             "auth_required": bool,
             "auth_type_hint": str,
             "allow_header": str,
@@ -32,14 +41,19 @@ def test_methods(client, base_url, path, skip_destructive=True):
     url = f"{base_url}{path}"
 
     methods_to_test = SAFE_METHODS if skip_destructive else ALL_METHODS
-    supported = []
+    methods_to_test = ["OPTIONS"] + [m for m in methods_to_test if m != "OPTIONS"]
+    supported = set()
     status_codes = {}
     auth_required = False
     auth_type_hint = ""
     allow_header = ""
     content_types = set()
+    challenged = False
 
     for method in methods_to_test:
+        if challenged and method in SAFE_METHODS:
+            supported.add(method)
+            continue
         resp = client.request(url, method=method)
 
         if resp.status_code == 0:
@@ -50,29 +64,27 @@ def test_methods(client, base_url, path, skip_destructive=True):
         # OPTIONS liefert oft Allow-Header
         if method == "OPTIONS" and "Allow" in resp.headers:
             allow_header = resp.headers["Allow"]
-            for m in allow_header.replace(" ", "").split(","):
-                m = m.strip().upper()
-                if m and m not in supported:
-                    supported.append(m)
+            supported.update(m.upper() for m in map(str.strip, allow_header.split(",")) if m)
 
         # Methode ist unterstuetzt wenn nicht 404/405
         if resp.status_code not in (404, 405, 501):
-            if method not in supported:
-                supported.append(method)
+            supported.add(method)
 
         # Auth-Detection
+        www_auth = ""
         if resp.status_code in (401, 403):
             auth_required = True
             www_auth = resp.headers.get("WWW-Authenticate", "")
             if www_auth:
-                if "bearer" in www_auth.lower():
+                www_auth_lower = www_auth.lower()
+                if "bearer" in www_auth_lower:
                     auth_type_hint = "bearer"
-                elif "basic" in www_auth.lower():
+                elif "basic" in www_auth_lower:
                     auth_type_hint = "basic"
-                elif "api" in www_auth.lower():
+                elif "api" in www_auth_lower:
                     auth_type_hint = "api_key"
                 else:
-                    auth_type_hint = www_auth.split()[0] if www_auth else ""
+                    auth_type_hint = www_auth.split()[0]
 
         # Content-Types sammeln
         if resp.content_type:
@@ -80,6 +92,11 @@ def test_methods(client, base_url, path, skip_destructive=True):
             if ct:
                 content_types.add(ct)
 
+        if www_auth:
+            challenged = True
+        if trust_allow_header and method == "OPTIONS" and supported and allow_header:
+            break
+
     return {
         "methods": sorted(supported),
         "status_codes": status_codes,
@@ -3,8 +3,11 @@ ApiProber.discovery.openapi_detect -- OpenAPI/Swagger Detection
 ================================================================
 Sucht nach OpenAPI/Swagger-Spezifikationen und extrahiert Endpoints.
 """
+import hashlib
 import json
 
+from .path_probe import probe_paths
+
 
 SWAGGER_PATHS = [
     "/swagger.json", "/openapi.json", "/api-docs",
@@ -15,30 +18,82 @@ SWAGGER_PATHS = [
     "/.well-known/openapi",
 ]
 
-
-def detect_openapi(client, base_url, robots_checker=None):
+# Server-Header (Teilstring, klein) -> typische Spec-Pfade des Frameworks,
+# werden vor SWAGGER_PATHS probiert
+_SERVER_PRIORITY = (
+    ("uvicorn", ("/openapi.json", "/docs")),
+    ("hypercorn", ("/openapi.json", "/docs")),
+    ("gunicorn", ("/openapi.json", "/swagger.json")),
+    ("werkzeug", ("/swagger.json",)),
+    ("kestrel", ("/swagger/v1/swagger.json",)),
+    ("microsoft-iis", ("/swagger/v1/swagger.json",)),
+    ("jetty", ("/v3/api-docs", "/v2/api-docs")),
+    ("apache-coyote", ("/v3/api-docs", "/v2/api-docs")),
+)
+
+# Reihenfolge bestimmt die Methoden-Liste und welcher doppelte Parameter gewinnt
+_HTTP_VERBS = ("get", "head", "post", "put", "patch", "delete", "options")
+_MISSING = object()
+
+
+def detect_openapi(client, base_url, robots_checker=None, concurrency=1,
+                   server_hint=""):
     """Versucht eine OpenAPI-Spec zu finden.
 
+    Sequentiell wird jeder Kandidat per GET geholt, bis eine Spec gefunden
+    ist. Mit concurrency > 1 werden alle Kandidaten parallel per HEAD
+    geprueft (bei 405/501 per GET); den Body holt ein GET dann nur fuer
+    Pfade, die geantwortet haben. Specs werden immer vollstaendig geladen
+    (max_body_bytes gilt nicht), grosse Specs sind die Regel.
+
     Args:
         client: HttpClient Instanz
         base_url: Basis-URL
         robots_checker: RobotsChecker oder None
+        concurrency: Anzahl gleichzeitiger HEAD-Requests
+        server_hint: Server-Header der Base-URL; bekannte Frameworks
+            bekommen ihre Standard-Pfade zuerst
 
     Returns:
-        (spec_url, spec_data) oder (None, None) wenn nichts gefunden
+        (spec_url, spec_data, digest) oder (None, None, None) wenn nichts
+        gefunden; digest ist der SHA-256 des Spec-Bodys (Cache-Key)
     """
     base_url = base_url.rstrip("/")
-
-    for path in SWAGGER_PATHS:
-        if robots_checker and not robots_checker.is_allowed(path):
-            continue
+    paths = _candidate_paths(server_hint)
+
+    if concurrency > 1:
+        candidates = probe_paths(client, base_url, paths,
+                                 robots_checker=robots_checker,
+                                 concurrency=concurrency)
+    else:
+        candidates = [
+            (path, None) for path in paths
+            if not robots_checker or robots_checker.is_allowed(path)
+        ]
+
+    for path, resp in candidates:
         url = f"{base_url}{path}"
-        resp = client.get(url)
+        if resp is None or resp.method != "GET" or resp.truncated:
+            if resp is not None and not resp.ok and resp.status_code not in (405, 501):
+                continue
+            # Specs immer vollstaendig laden, max_body_bytes gilt hier nicht
+            resp = client.get(url, max_bytes=0)
         if resp.ok and resp.body:
             spec = _try_parse_spec(resp.body)
             if spec:
-                return url, spec
-    return None, None
+                digest = hashlib.sha256(resp.body.encode("utf-8")).hexdigest()
+                return url, spec, digest
+    return None, None, None
+
+
+def _candidate_paths(server_hint):
+    """SWAGGER_PATHS, passende Framework-Pfade aus dem Server-Header vorne."""
+    server = server_hint.lower()
+    hinted = [path for name, paths in _SERVER_PRIORITY if name in server
+              for path in paths]
+    if not hinted:
+        return SWAGGER_PATHS
+    return list(dict.fromkeys(hinted + SWAGGER_PATHS))
 
 
 def extract_endpoints_from_spec(spec):
@@ -51,12 +106,7 @@ def extract_endpoints_from_spec(spec):
         list: [{"path": str, "methods": [str], "description": str, "parameters": [dict]}, ...]
     """
     endpoints = []
-
-    # OpenAPI 3.x
     paths = spec.get("paths", {})
-    if not paths and "basePath" in spec:
-        paths = spec.get("paths", {})
-
     base_path = spec.get("basePath", "")
 
     for path, methods_obj in paths.items():
@@ -67,47 +117,61 @@ def extract_endpoints_from_spec(spec):
         methods = []
         description = ""
         parameters = []
-
-        for method in ("get", "head", "post", "put", "patch", "delete", "options"):
-            if method in methods_obj:
-                methods.append(method.upper())
-                op = methods_obj[method]
-                if isinstance(op, dict):
-                    if not description:
-                        description = op.get("summary", op.get("description", ""))
-                    # Parameter sammeln
-                    for param in op.get("parameters", []):
-                        if isinstance(param, dict):
-                            parameters.append({
-                                "name": param.get("name", ""),
-                                "location": param.get("in", "query"),
-                                "required": param.get("required", False),
-                                "type": param.get("type",
-                                         param.get("schema", {}).get("type", "string"))
-                            })
+        seen = set()
+
+        for method in _HTTP_VERBS:
+            op = methods_obj.get(method, _MISSING)
+            if op is _MISSING:
+                continue
+            methods.append(method.upper())
+            if isinstance(op, dict):
+                if not description:
+                    description = op.get("summary", op.get("description", ""))
+                # Parameter sammeln
+                _collect_params(op.get("parameters", []), parameters, seen)
 
         # Top-level Parameters (gelten fuer alle Methoden)
-        for param in methods_obj.get("parameters", []):
-            if isinstance(param, dict):
-                parameters.append({
-                    "name": param.get("name", ""),
-                    "location": param.get("in", "query"),
-                    "required": param.get("required", False),
-                    "type": param.get("type",
-                             param.get("schema", {}).get("type", "string"))
-                })
+        _collect_params(methods_obj.get("parameters", []), parameters, seen)
 
         if methods:
             endpoints.append({
                 "path": full_path,
                 "methods": methods,
                 "description": description,
-                "parameters": _dedupe_params(parameters)
+                "parameters": parameters
             })
 
     return endpoints
 
 
+def _collect_params(raw_params, parameters, seen):
+    """Haengt Spec-Parameter an parameters an; Duplikate (name, in) ueber seen verwerfen."""
+    for param in raw_params:
+        if not isinstance(param, dict):
+            continue
+        name = param.get("name", "")
+        location = param.get("in", "query")
+        if (name, location) in seen:
+            continue
+        seen.add((name, location))
+        parameters.append({
+            "name": name,
+            "location": location,
+            "required": param.get("required", False),
+            "type": _param_type(param)
+        })
+
+
+def _param_type(param):
+    """Parameter-Typ (Swagger 2: "type", OpenAPI 3: schema.type), ohne Hilfs-dicts."""
+    if "type" in param:
+        return param["type"]
+    schema = param.get("schema")
+    if isinstance(schema, dict):
+        return schema.get("type", "string")
+    return "string"
+
+
 def _try_parse_spec(body):
     """Versucht Body als OpenAPI/Swagger-Spec zu parsen."""
     try:
@@ -119,15 +183,3 @@ def _try_parse_spec(body):
     except (json.JSONDecodeError, ValueError):
         pass
     return None
-
-
-def _dedupe_params(params):
-    """Entfernt Duplikate aus Parameter-Liste."""
-    seen = set()
-    unique = []
-    for p in params:
-        key = (p.get("name", ""), p.get("location", ""))
-        if key not in seen:
-            seen.add(key)
-            unique.append(p)
-    return unique
@@ -3,9 +3,14 @@ ApiProber.discovery.orchestrator -- Zentrale Steuerung aller Strategien
 ========================================================================
 Koordiniert OpenAPI-Detection, Wordlist, Pattern und Response-Driven.
 """
+import functools
 import json
 import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urlparse
 
 from ..core.config import load_config, get_db_path
 from ..core.database import Database
@@ -15,8 +20,14 @@ from ..core.schema_extractor import extract_schema_from_body, extract_params_fro
 from .openapi_detect import detect_openapi, extract_endpoints_from_spec
 from .wordlist import probe_wordlist
 from .pattern import probe_patterns
-from .response_driven import discover_from_responses
+from .response_driven import discover_from_responses, extract_links_from_body
 from .method_tester import test_methods
+from .path_probe import head_or_get
+
+# STOP-Datei im Paket-Root; existiert sie, wird das Probing abgebrochen.
+# Geprueft (stat) wird hoechstens einmal pro Sekunde.
+_STOP_FILE = Path(__file__).resolve().parent.parent / "STOP"
+_STOP_CHECK_INTERVAL_NS = 1_000_000_000
 
 
 class ProbeOrchestrator:
@@ -24,9 +35,18 @@ class ProbeOrchestrator:
 
     def __init__(self, config=None):
         self.config = config or load_config()
-        self.db = Database(get_db_path(self.config))
+        self.db = Database(get_db_path(self.config),
+                           mmap_size=self.config.get("db_mmap_size", 0))
+        # Ein Client (und damit ein Keep-Alive-Pool) fuer alle Phasen
         self.client = HttpClient(self.config)
         self._stop_requested = False
+        self._stop_checked_ns = None
+        self._stop_found = False
+
+    def close(self):
+        """Offene Verbindungen und die DB schliessen."""
+        self.client.close()
+        self.db.close()
 
     def probe(self, url, depth=None):
         """Hauptmethode: Vollstaendiges Probing eines Service.
@@ -45,6 +65,7 @@ class ProbeOrchestrator:
         service_name = self._derive_service_name(base_url)
         max_requests = self.config.get("max_requests", 500)
         skip_destructive = self.config.get("skip_destructive", True)
+        concurrency = self.config.get("concurrency", 1)
 
         print(f"[ApiProber] Starte Probing: {base_url}")
         print(f"  Service-Name: {service_name}")
@@ -79,6 +100,7 @@ class ProbeOrchestrator:
         # 3. Base-URL testen
         print("[Phase 0] Base-URL testen...")
         base_resp = self.client.get(base_url)
+        server = ""
         if base_resp.status_code > 0:
             server = base_resp.headers.get("Server", "")
             if server:
@@ -104,27 +126,38 @@ class ProbeOrchestrator:
         # 4. OpenAPI-Detection (Prio 1)
         if "openapi" in strategies and not self._check_limits(max_requests):
             print("[Phase 1] OpenAPI/Swagger Detection...")
-            spec_url, spec = detect_openapi(self.client, base_url, robots)
+            spec_url, spec, spec_digest = detect_openapi(
+                self.client, base_url, robots, concurrency=concurrency,
+                server_hint=server
+            )
             if spec:
                 print(f"  GEFUNDEN: {spec_url}")
-                spec_endpoints = extract_endpoints_from_spec(spec)
+                # Unveraenderte Spec (gleicher Hash) nicht erneut auswerten
+                spec_endpoints = self.db.get_openapi_cache(spec_digest)
+                if spec_endpoints is None:
+                    spec_endpoints = extract_endpoints_from_spec(spec)
+                    self.db.put_openapi_cache(spec_digest, spec_endpoints)
                 print(f"  {len(spec_endpoints)} Endpoints in Spec")
-                for ep in spec_endpoints:
-                    ep_id = self.db.upsert_endpoint(
-                        service_id, ep["path"],
-                        methods=ep["methods"],
-                        discovered_by="openapi"
-                    )
-                    known_paths.add(ep["path"])
-                    endpoints_found += 1
-                    # Parameter speichern
-                    for param in ep.get("parameters", []):
-                        self.db.upsert_parameter(
-                            ep_id,
-                            name=param["name"],
-                            param_type=param.get("type", "string"),
-                            location=param.get("location", "query"),
-                            required=param.get("required", False)
+                # Alle Spec-Endpoints in einer Transaktion schreiben
+                with self.db.transaction():
+                    for ep in spec_endpoints:
+                        ep_id = self.db.upsert_endpoint(
+                            service_id, ep["path"],
+                            methods=ep["methods"],
+                            discovered_by="openapi"
+                        )
+                        known_paths.add(ep["path"])
+                        endpoints_found += 1
+                        # Parameter speichern
+                        self.db.upsert_parameters_bulk(
+                            {
+                                "endpoint_id": ep_id,
+                                "name": param["name"],
+                                "param_type": param.get("type", "string"),
+                                "location": param.get("location", "query"),
+                                "required": param.get("required", False),
+                            }
+                            for param in ep.get("parameters", [])
                         )
                 # Spec als Metadata speichern
                 meta = {"openapi_spec_url": spec_url}
@@ -144,9 +177,10 @@ class ProbeOrchestrator:
             results = probe_wordlist(
                 self.client, base_url, wordlist_names,
                 robots_checker=robots, known_paths=known_paths,
-                callback=on_endpoint_found, max_requests=max_requests
+                callback=on_endpoint_found, max_requests=max_requests,
+                concurrency=concurrency
             )
-            self._process_results(service_id, results, "wordlist")
+            self._process_results(service_id, base_url, results, "wordlist")
             print(f"  {len(results)} neue Endpoints entdeckt")
             print()
 
@@ -156,68 +190,40 @@ class ProbeOrchestrator:
             results = probe_patterns(
                 self.client, base_url, self.config,
                 robots_checker=robots, known_paths=known_paths,
-                callback=on_endpoint_found, max_requests=max_requests
+                callback=on_endpoint_found, max_requests=max_requests,
+                concurrency=concurrency
             )
-            self._process_results(service_id, results, "pattern")
+            self._process_results(service_id, base_url, results, "pattern")
             print(f"  {len(results)} neue Endpoints entdeckt")
             print()
 
+        # Phase 4-6 fuegen keine Endpoints hinzu: einmal laden, lokal mitfuehren
+        endpoints = self.db.get_endpoints(service_id)
+
         # 7. Method-Testing fuer entdeckte Endpoints
         if not self._check_limits(max_requests):
             print("[Phase 4] Method-Testing...")
-            endpoints = self.db.get_endpoints(service_id)
             tested = 0
-            for ep in endpoints:
-                if self._check_limits(max_requests):
-                    break
-                method_info = test_methods(
-                    self.client, base_url, ep["path"],
-                    skip_destructive=skip_destructive
-                )
-                self.db.upsert_endpoint(
-                    service_id, ep["path"],
-                    methods=method_info["methods"],
-                    status_codes=list(method_info["status_codes"].values()),
-                    auth_required=method_info["auth_required"],
-                    auth_type_hint=method_info["auth_type_hint"],
-                    content_types=method_info["content_types"]
-                )
-                tested += 1
-            print(f"  {tested} Endpoints getestet")
+            from_spec = 0
+            for ep, spec_methods in self._map_endpoints(
+                    lambda ep: self._test_endpoint(service_id, base_url, ep, skip_destructive),
+                    endpoints, max_requests, concurrency):
+                if spec_methods:
+                    from_spec += 1
+                else:
+                    tested += 1
+            print(f"  {tested} Endpoints getestet, {from_spec} aus der Spec uebernommen")
             print()
 
         # 8. Detaillierte GET-Responses fuer Schema-Extraktion
         if not self._check_limits(max_requests):
             print("[Phase 5] Schema-Extraktion...")
-            endpoints = self.db.get_endpoints(service_id)
             schemas_extracted = 0
-            for ep in endpoints:
-                if self._check_limits(max_requests):
-                    break
-                methods = json.loads(ep.get("methods_json", "[]"))
-                if "GET" not in methods:
-                    continue
-                url = f"{base_url}{ep['path']}"
-                resp = self.client.get(url)
-                if resp.ok and resp.body:
-                    schema = extract_schema_from_body(resp.body)
-                    if schema:
-                        self.db.add_response(
-                            ep["id"], "GET", resp.status_code,
-                            headers=resp.headers,
-                            body_schema=schema,
-                            body_sample=resp.body[:2048],
-                            content_type=resp.content_type,
-                            elapsed_ms=resp.elapsed_ms
-                        )
-                        schemas_extracted += 1
-                elif resp.status_code in (400, 422) and resp.body:
-                    # Parameter-Hints aus Error-Body
-                    params = extract_params_from_error(resp.body)
-                    for name, required in params:
-                        self.db.upsert_parameter(
-                            ep["id"], name, required=required
-                        )
+            for ep, extracted in self._map_endpoints(
+                    lambda ep: self._extract_endpoint_schema(base_url, ep),
+                    endpoints, max_requests, concurrency):
+                if extracted:
+                    schemas_extracted += 1
             print(f"  {schemas_extracted} Schemas extrahiert")
             print()
 
@@ -228,9 +234,9 @@ class ProbeOrchestrator:
                 self.client, base_url, self.db, service_id,
                 robots_checker=robots, known_paths=known_paths,
                 max_depth=self.config.get("max_depth", 2),
-                callback=on_endpoint_found
+                callback=on_endpoint_found, endpoints=endpoints
             )
-            self._process_results(service_id, results, "response_driven")
+            self._process_results(service_id, base_url, results, "response_driven")
             print(f"  {len(results)} neue Endpoints entdeckt")
             print()
 
@@ -292,67 +298,185 @@ class ProbeOrchestrator:
 
         return self.probe(service["base_url"])
 
-    def _process_results(self, service_id, results, discovered_by):
-        """Verarbeitet Probe-Ergebnisse in die DB."""
-        for path, resp in results:
-            content_types = []
-            if resp.content_type:
-                ct = resp.content_type.split(";")[0].strip()
-                if ct:
-                    content_types = [ct]
-
-            auth_required = resp.status_code in (401, 403)
-            auth_hint = ""
-            if auth_required:
-                www_auth = resp.headers.get("WWW-Authenticate", "")
-                if "bearer" in www_auth.lower():
-                    auth_hint = "bearer"
-                elif "basic" in www_auth.lower():
-                    auth_hint = "basic"
-
-            ep_id = self.db.upsert_endpoint(
-                service_id, path,
-                methods=[resp.method] if resp.method else [],
-                status_codes=[resp.status_code],
-                auth_required=auth_required,
-                auth_type_hint=auth_hint,
-                content_types=content_types,
-                discovered_by=discovered_by
-            )
+    def _map_endpoints(self, func, endpoints, max_requests, concurrency):
+        """func(ep) fuer jeden Endpoint, bis das Request-Limit greift.
+
+        Mit concurrency > 1 laufen bis zu concurrency Endpoints gleichzeitig
+        (Threads); die Ergebnisse kommen trotzdem in Endpoint-Reihenfolge.
+
+        Yields:
+            (ep, func(ep))
+        """
+        if concurrency <= 1:
+            for ep in endpoints:
+                if self._check_limits(max_requests):
+                    break
+                yield ep, func(ep)
+            return
 
-            # Response speichern wenn Body vorhanden
-            if resp.body and resp.ok:
-                schema = extract_schema_from_body(resp.body)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for ep in endpoints:
+                if self._check_limits(max_requests):
+                    break
+                pending.append((ep, pool.submit(func, ep)))
+                if len(pending) >= concurrency:
+                    done_ep, future = pending.popleft()
+                    yield done_ep, future.result()
+            while pending:
+                done_ep, future = pending.popleft()
+                yield done_ep, future.result()
+
+    def _test_endpoint(self, service_id, base_url, ep, skip_destructive):
+        """Phase 4 fuer einen Endpoint. True, wenn die Methoden aus der Spec stammen."""
+        if ep["discovered_by"] == "openapi" and ep["methods"]:
+            # Methoden stehen in der Spec; nur Auth pruefen (HEAD, sonst GET)
+            self._check_spec_endpoint_auth(service_id, base_url, ep["path"])
+            return True
+        method_info = test_methods(
+            self.client, base_url, ep["path"],
+            skip_destructive=skip_destructive,
+            trust_allow_header=self.config.get("trust_allow_header", True)
+        )
+        self.db.upsert_endpoint(
+            service_id, ep["path"],
+            methods=method_info["methods"],
+            status_codes=list(method_info["status_codes"].values()),
+            auth_required=method_info["auth_required"],
+            auth_type_hint=method_info["auth_type_hint"],
+            content_types=method_info["content_types"]
+        )
+        # Wie die Vereinigung in upsert_endpoint
+        ep["methods"] = tuple(sorted(set(ep["methods"]).union(method_info["methods"])))
+        return False
+
+    def _extract_endpoint_schema(self, base_url, ep):
+        """Phase 5 fuer einen Endpoint. True, wenn ein Schema gespeichert wurde."""
+        if "GET" not in ep["methods"]:
+            return False
+        # Schema liegt schon aus einer frueheren GET-Response vor
+        if self.db.has_fresh_get_response(ep["id"]):
+            return False
+        url = f"{base_url}{ep['path']}"
+        resp = self.client.get(url)
+        if resp.ok and resp.body:
+            schema = extract_schema_from_body(resp.body, resp.truncated)
+            # Abgeschnittene Bodies immer speichern, sonst wird der Endpoint
+            # bei jedem Lauf erneut geholt
+            if schema or resp.truncated:
                 self.db.add_response(
-                    ep_id, resp.method or "GET", resp.status_code,
+                    ep["id"], "GET", resp.status_code,
                     headers=resp.headers,
                     body_schema=schema,
-                    body_sample=resp.body[:2048],
+                    body_sample=resp.body,
                     content_type=resp.content_type,
-                    elapsed_ms=resp.elapsed_ms
+                    elapsed_ms=resp.elapsed_ms,
+                    truncated=resp.truncated,
+                    links=extract_links_from_body(resp.body, base_url, resp.truncated)
+                )
+                return True
+        elif resp.status_code in (400, 422) and resp.body:
+            # Parameter-Hints aus Error-Body
+            params = extract_params_from_error(resp.body)
+            for name, required in params:
+                self.db.upsert_parameter(
+                    ep["id"], name, required=required
                 )
+        return False
+
+    def _check_spec_endpoint_auth(self, service_id, base_url, path):
+        """Ein Request auf einen Spec-Endpoint (HEAD, sonst GET), um Auth-Pflicht zu erkennen."""
+        resp = head_or_get(self.client, f"{base_url}{path}")
+        if resp.status_code not in (401, 403):
+            return
+        www_auth = resp.headers.get("WWW-Authenticate", "").lower()
+        auth_hint = ""
+        if "bearer" in www_auth:
+            auth_hint = "bearer"
+        elif "basic" in www_auth:
+            auth_hint = "basic"
+        self.db.upsert_endpoint(
+            service_id, path, auth_required=True, auth_type_hint=auth_hint
+        )
+
+    def _process_results(self, service_id, base_url, results, discovered_by):
+        """Verarbeitet Probe-Ergebnisse in die DB (eine Transaktion, ein Commit)."""
+        responses = []
+        with self.db.transaction():
+            for path, resp in results:
+                content_types = []
+                if resp.content_type:
+                    ct = resp.content_type.split(";")[0].strip()
+                    if ct:
+                        content_types = [ct]
+
+                auth_required = resp.status_code in (401, 403)
+                auth_hint = ""
+                if auth_required:
+                    www_auth = resp.headers.get("WWW-Authenticate", "")
+                    if "bearer" in www_auth.lower():
+                        auth_hint = "bearer"
+                    elif "basic" in www_auth.lower():
+                        auth_hint = "basic"
+
+                ep_id = self.db.upsert_endpoint(
+                    service_id, path,
+                    methods=[resp.method] if resp.method else [],
+                    status_codes=[resp.status_code],
+                    auth_required=auth_required,
+                    auth_type_hint=auth_hint,
+                    content_types=content_types,
+                    discovered_by=discovered_by
+                )
+
+                # Response speichern wenn Body vorhanden (GET nur einmal pro Endpoint)
+                method = resp.method or "GET"
+                if resp.body and resp.ok and not (
+                        method == "GET" and self.db.has_fresh_get_response(ep_id)):
+                    responses.append({
+                        "endpoint_id": ep_id,
+                        "method": method,
+                        "status_code": resp.status_code,
+                        "headers": resp.headers,
+                        "body_schema": extract_schema_from_body(resp.body, resp.truncated),
+                        "body_sample": resp.body,
+                        "content_type": resp.content_type,
+                        "elapsed_ms": resp.elapsed_ms,
+                        "truncated": resp.truncated,
+                        "links": extract_links_from_body(resp.body, base_url,
+                                                         resp.truncated),
+                    })
+            self.db.add_responses_bulk(responses)
 
     def _check_limits(self, max_requests):
         """Prueft ob Request-Limit erreicht ist."""
         if self.client.request_count >= max_requests:
             print(f"  [LIMIT] Max Requests erreicht ({max_requests})")
             return True
-        # STOP-Datei pruefen
-        stop_file = Path(__file__).resolve().parent.parent / "STOP"
-        if stop_file.exists():
+        # STOP-Datei pruefen (Ergebnis fuer _STOP_CHECK_INTERVAL_NS gecacht)
+        now_ns = time.monotonic_ns()
+        if (self._stop_checked_ns is None
+                or now_ns - self._stop_checked_ns >= _STOP_CHECK_INTERVAL_NS):
+            self._stop_found = _STOP_FILE.exists()
+            self._stop_checked_ns = now_ns
+        if self._stop_found:
             print("  [STOP] STOP-Datei gefunden -- Abbruch")
             return True
         return False
 
     def _derive_service_name(self, url):
         """Leitet einen Service-Namen aus der URL ab."""
-        from urllib.parse import urlparse
-        parsed = urlparse(url)
-        host = parsed.hostname or "unknown"
-        # Subdomains entfernen fuer kurzen Namen
-        parts = host.split(".")
-        if len(parts) >= 2:
-            name = parts[-2]  # z.B. "jsonplaceholder" aus "jsonplaceholder.typicode.com"
-        else:
-            name = host
-        return name
+        return _derive_service_name(url)
+
+
+@functools.lru_cache(maxsize=256)
+def _derive_service_name(url):
+    parsed = urlparse(url)
+    host = parsed.hostname or "unknown"
+    # Subdomains entfernen fuer kurzen Namen
+    parts = host.split(".")
+    if len(parts) >= 2:
+        name = parts[-2]  # z.B. "jsonplaceholder" aus "jsonplaceholder.typicode.com"
+    else:
+        name = host
+    return name
@@ -0,0 +1,98 @@
+"""
+ApiProber.discovery.path_probe -- Pfadlisten testen (HEAD, bei 405 GET)
+=========================================================================
+Gemeinsame Schleife fuer Wordlist- und Pattern-Probing, optional mit
+mehreren parallelen Requests (Threads; Rate-Limit gilt weiterhin global).
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def probe_paths(client, base_url, paths, robots_checker=None, known_paths=None,
+                callback=None, max_requests=None, concurrency=1):
+    """Testet Pfade gegen einen Service.
+
+    Ergebnisse und Callbacks kommen immer in der Reihenfolge von paths,
+    auch wenn die Requests parallel laufen.
+
+    Args:
+        client: HttpClient Instanz
+        base_url: Basis-URL (ohne Trailing Slash)
+        paths: Iterable von Pfaden
+        robots_checker: RobotsChecker oder None
+        known_paths: Set bereits bekannter Pfade (werden uebersprungen,
+            Funde werden direkt in dieses Set eingetragen)
+        callback: Funktion(path, response) fuer jeden Fund
+        max_requests: Maximale Gesamtzahl Requests (Client-zaehler)
+        concurrency: Anzahl gleichzeitiger Requests (1 = sequentiell)
+
+    Returns:
+        list: [(path, response), ...] fuer gefundene Pfade
+    """
+    # Ein uebergebenes Set wird geteilt (Funde landen beim Aufrufer);
+    # andere Iterables werden fuer O(1)-Lookups in ein Set kopiert
+    known = known_paths if isinstance(known_paths, set) else set(known_paths or ())
+    results = []
+
+    def handle(path, resp):
+        # Endpoint gefunden (nicht 404, nicht Connection Error)
+        if resp.status_code > 0 and resp.status_code != 404:
+            results.append((path, resp))
+            known.add(path)
+            if callback:
+                callback(path, resp)
+
+    # Reine CPU-Filter vorab, die Schleifen enthalten nur noch Netzwerk-Arbeit
+    candidates = [
+        path for path in paths
+        if path not in known
+        and (not robots_checker or robots_checker.is_allowed(path))
+    ]
+    if max_requests:
+        # Jeder Pfad kostet mindestens einen Request: mehr als das Restbudget
+        # kann nie drankommen (405 -> GET kostet zwei, daher weiter pruefen)
+        del candidates[max(0, max_requests - client.request_count):]
+
+    if concurrency <= 1:
+        for path in candidates:
+            if max_requests and client.request_count >= max_requests:
+                break
+            handle(path, head_or_get(client, f"{base_url}{path}"))
+        return results
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for path in candidates:
+            # Laufende Requests mitzaehlen; wird es knapp, erst abarbeiten und
+            # dann exakt pruefen, damit max_requests wie sequentiell greift
+            while (max_requests and pending
+                   and client.request_count + len(pending) >= max_requests):
+                done_path, future = pending.popleft()
+                handle(done_path, future.result())
+            if max_requests and client.request_count >= max_requests:
+                break
+            pending.append((path, pool.submit(head_or_get, client, f"{base_url}{path}")))
+            if len(pending) >= concurrency:
+                done_path, future = pending.popleft()
+                handle(done_path, future.result())
+        while pending:
+            done_path, future = pending.popleft()
+            handle(done_path, future.result())
+    return results
+
+
+def head_or_get(client, url):
+    """HEAD-Request; liefert der Server 405, wird GET versucht.
+
+    Klappt das GET, lehnt der Host HEAD offenbar generell ab: danach wird
+    fuer diesen Host direkt GET verwendet. (Lehnt auch GET mit 405 ab, ist
+    es nur diese Route.)
+    """
+    if not client.head_supported(url):
+        return client.get(url)
+    resp = client.head(url)
+    if resp.status_code == 405:
+        resp = client.get(url)
+        if resp.status_code not in (0, 405):
+            client.mark_head_unsupported(url)
+    return resp
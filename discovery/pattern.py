@@ -3,6 +3,10 @@ ApiProber.discovery.pattern -- Pattern-basiertes Probing
 ==========================================================
 Expandiert Pfad-Patterns wie /api/v{1,2,3}/{resource}.
 """
+import functools
+from itertools import chain, product
+
+from .path_probe import probe_paths
 
 
 def generate_patterns(config):
@@ -12,42 +16,34 @@ def generate_patterns(config):
         config: Konfiguration mit pattern_versions und pattern_resources
 
     Returns:
-        list: Expandierte Pfade
+        tuple: Expandierte Pfade (sortiert, pro Versions/Ressourcen-Kombination gecacht)
     """
     versions = config.get("pattern_versions", [1, 2, 3])
     resources = config.get("pattern_resources", [
         "users", "posts", "comments", "items", "products"
     ])
+    return _expand_patterns(tuple(versions), tuple(resources))
 
-    paths = set()
-
-    # /api/v{N}/{resource}
-    for v in versions:
-        for res in resources:
-            paths.add(f"/api/v{v}/{res}")
-
-    # /v{N}/{resource}
-    for v in versions:
-        for res in resources:
-            paths.add(f"/v{v}/{res}")
-
-    # /{resource} (ohne Version)
-    for res in resources:
-        paths.add(f"/{res}")
-
-    # /{resource}/1 (Einzelressource-Test)
-    for res in resources:
-        paths.add(f"/{res}/1")
-
-    # /api/{resource}
-    for res in resources:
-        paths.add(f"/api/{res}")
 
-    return sorted(paths)
+@functools.lru_cache(maxsize=32)
+def _expand_patterns(versions, resources):
+    return tuple(sorted(set(chain(
+        # /api/v{N}/{resource}
+        (f"/api/v{v}/{res}" for v, res in product(versions, resources)),
+        # /v{N}/{resource}
+        (f"/v{v}/{res}" for v, res in product(versions, resources)),
+        # /{resource} (ohne Version)
+        (f"/{res}" for res in resources),
+        # /{resource}/1 (Einzelressource-Test)
+        (f"/{res}/1" for res in resources),
+        # /api/{resource}
+        (f"/api/{res}" for res in resources),
+    ))))
 
 
 def probe_patterns(client, base_url, config, robots_checker=None,
-                   known_paths=None, callback=None, max_requests=None):
+                   known_paths=None, callback=None, max_requests=None,
+                   concurrency=1):
     """Testet Pattern-generierte Pfade.
 
     Args:
@@ -58,33 +54,13 @@ def probe_patterns(client, base_url, config, robots_checker=None,
         known_paths: Set bereits bekannter Pfade
         callback: Funktion(path, response) bei Fund
         max_requests: Maximale Gesamtzahl Requests (Client-zaehler)
+        concurrency: Anzahl gleichzeitiger Requests (1 = sequentiell)
 
     Returns:
         list: [(path, response), ...]
     """
-    base_url = base_url.rstrip("/")
-    paths = generate_patterns(config)
-    known = known_paths or set()
-    results = []
-
-    for path in paths:
-        if max_requests and client.request_count >= max_requests:
-            break
-        if path in known:
-            continue
-        if robots_checker and not robots_checker.is_allowed(path):
-            continue
-
-        url = f"{base_url}{path}"
-        resp = client.head(url)
-
-        if resp.status_code == 405:
-            resp = client.get(url)
-
-        if resp.status_code > 0 and resp.status_code != 404:
-            results.append((path, resp))
-            known.add(path)
-            if callback:
-                callback(path, resp)
-
-    return results
+    return probe_paths(
+        client, base_url.rstrip("/"), generate_patterns(config),
+        robots_checker=robots_checker, known_paths=known_paths,
+        callback=callback, max_requests=max_requests, concurrency=concurrency
+    )
@@ -4,16 +4,18 @@ ApiProber.discovery.response_driven -- HATEOAS / Link-Following
 Extrahiert Links aus bereits entdeckten Responses und folgt ihnen.
 """
 import json
-from ..core.schema_extractor import extract_links_from_json
+from ..core.schema_extractor import decode_truncated_json, extract_links_from_json
 
 
 def discover_from_responses(client, base_url, db, service_id,
                             robots_checker=None, known_paths=None,
-                            max_depth=2, callback=None):
+                            max_depth=2, callback=None, endpoints=None):
     """Entdeckt neue Endpoints durch Link-Following.
 
-    Liest bestehende Responses aus der DB, extrahiert Links,
-    und testet sie als potentielle Endpoints.
+    Liest die Links bestehender Responses aus der DB (links_json)
+    und testet sie als potentielle Endpoints. Jede weitere Tiefe folgt den
+    Links in den Antworten der zuletzt gefundenen Endpoints; jeder Pfad wird
+    hoechstens einmal angefragt.
 
     Args:
         client: HttpClient Instanz
@@ -24,35 +26,35 @@ def discover_from_responses(client, base_url, db, service_id,
         known_paths: Set bekannter Pfade
         max_depth: Maximale Rekursionstiefe
         callback: Funktion(path, response)
+        endpoints: Bereits geladene Endpoints des Services (sonst aus der DB)
 
     Returns:
         list: [(path, response), ...]
     """
     base_url = base_url.rstrip("/")
-    known = known_paths or set()
+    known = known_paths if isinstance(known_paths, set) else set(known_paths or ())
     all_results = []
+    tried = set()
 
-    for depth in range(max_depth):
-        new_links = set()
-
-        # Bekannte Endpoints durchgehen und Links aus deren Responses sammeln
+    # Tiefe 0: beim Speichern extrahierte Links der gespeicherten Responses;
+    # jede weitere Tiefe nur die Links der in der Vorrunde gefundenen Endpoints
+    links = set()
+    if endpoints is None:
         endpoints = db.get_endpoints(service_id)
-        for ep in endpoints:
-            responses = db.get_responses(ep["id"])
-            for resp_row in responses:
-                body = resp_row.get("body_sample", "")
-                if not body:
-                    continue
-                try:
-                    data = json.loads(body)
-                    links = extract_links_from_json(data, base_url)
-                    for link in links:
-                        # Relative Pfade normalisieren
-                        path = _normalize_link(link, base_url)
-                        if path and path not in known:
-                            new_links.add(path)
-                except (json.JSONDecodeError, ValueError):
-                    continue
+    for ep in endpoints:
+        for resp_row in db.get_responses(ep["id"]):
+            links_json = resp_row.get("links_json")
+            if links_json is None:
+                # Zeile aus einer aelteren DB: Body-Sample parsen
+                links.update(extract_links_from_body(
+                    resp_row.get("body_sample", ""), base_url,
+                    bool(resp_row.get("truncated"))
+                ))
+            else:
+                links.update(json.loads(links_json))
+
+    for depth in range(max_depth):
+        new_links = links - known - tried
 
         if not new_links:
             break
@@ -63,6 +65,7 @@ def discover_from_responses(client, base_url, db, service_id,
             if robots_checker and not robots_checker.is_allowed(path):
                 continue
 
+            tried.add(path)
             url = f"{base_url}{path}"
             resp = client.get(url)
 
@@ -76,10 +79,39 @@ def discover_from_responses(client, base_url, db, service_id,
 
         if not round_results:
             break
+        links = set()
+        for _, resp in round_results:
+            if resp.ok:
+                links.update(extract_links_from_body(resp.body, base_url, resp.truncated))
 
     return all_results
 
 
+def extract_links_from_body(body, base_url, truncated=False):
+    """Normalisierte Link-Pfade aus einem JSON-Body.
+
+    Args:
+        body: Response-Body als String
+        base_url: Basis-URL
+        truncated: Body ist abgeschnitten; dann zaehlt der vollstaendige Anfang
+
+    Returns:
+        list: Sortierte Pfade (leer bei Nicht-JSON)
+    """
+    if not body:
+        return []
+    base_url = base_url.rstrip("/")
+    try:
+        data = decode_truncated_json(body) if truncated else json.loads(body)
+    except (json.JSONDecodeError, ValueError, RecursionError):
+        return []
+    # Relative Pfade normalisieren
+    paths = {_normalize_link(link, base_url)
+             for link in extract_links_from_json(data, base_url)}
+    paths.discard(None)
+    return sorted(paths)
+
+
 def _normalize_link(link, base_url):
     """Normalisiert einen Link zu einem relativen Pfad."""
     if link.startswith(base_url):
@@ -88,10 +120,10 @@ def _normalize_link(link, base_url):
         link = "/" + link
     # Query-Parameter entfernen
     if "?" in link:
-        link = link.split("?")[0]
+        link = link.split("?", 1)[0]
     # Fragment entfernen
     if "#" in link:
-        link = link.split("#")[0]
+        link = link.split("#", 1)[0]
     # Trailing Slash normalisieren
     if link != "/" and link.endswith("/"):
         link = link.rstrip("/")
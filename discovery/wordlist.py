@@ -3,29 +3,43 @@ ApiProber.discovery.wordlist -- Wordlist-basiertes Probing
 ============================================================
 Testet bekannte API-Pfade gegen den Ziel-Service.
 """
-from pathlib import Path
+import functools
+from itertools import chain
+
+from ..core.config import BASE_DIR
+from .path_probe import probe_paths
+
+_WORDLIST_DIR = BASE_DIR / "wordlists"
 
 
 def load_wordlist(wordlist_name):
     """Laedt Pfade aus einer Wordlist-Datei.
 
+    Das Ergebnis wird pro (Datei, mtime) gecacht; geaenderte Dateien
+    werden neu gelesen.
+
     Args:
         wordlist_name: Dateiname (z.B. "common_rest.txt")
 
     Returns:
-        list: Liste von Pfaden
+        tuple: Pfade (leer, wenn die Datei fehlt)
     """
-    wordlist_dir = Path(__file__).resolve().parent.parent / "wordlists"
-    filepath = wordlist_dir / wordlist_name
-    if not filepath.exists():
-        return []
-    paths = []
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith("#"):
-                paths.append(line)
-    return paths
+    filepath = _WORDLIST_DIR / wordlist_name
+    try:
+        mtime_ns = filepath.stat().st_mtime_ns
+    except OSError:
+        return ()
+    return _read_wordlist(filepath, mtime_ns)
+
+
+@functools.lru_cache(maxsize=64)
+def _read_wordlist(filepath, mtime_ns):
+    """Wordlist-Datei parsen (mtime_ns dient nur als Cache-Key)."""
+    # Einmal binaer lesen und splitten; dekodiert werden nur die Pfade,
+    # nicht Kommentare und Leerzeilen
+    raw = filepath.read_bytes()
+    return tuple(line.decode("utf-8") for line in map(bytes.strip, raw.splitlines())
+                 if line and line[:1] != b"#")
 
 
 def load_all_wordlists(wordlist_names=None):
@@ -38,24 +52,18 @@ def load_all_wordlists(wordlist_names=None):
         list: Deduplizierte Liste von Pfaden
     """
     if wordlist_names is None:
-        wordlist_dir = Path(__file__).resolve().parent.parent / "wordlists"
-        if wordlist_dir.exists():
-            wordlist_names = [f.name for f in wordlist_dir.glob("*.txt")]
-        else:
-            wordlist_names = []
-
-    seen = set()
-    paths = []
-    for name in wordlist_names:
-        for path in load_wordlist(name):
-            if path not in seen:
-                seen.add(path)
-                paths.append(path)
-    return paths
+        # glob() auf ein fehlendes Verzeichnis liefert einfach nichts
+        wordlist_names = [f.name for f in _WORDLIST_DIR.glob("*.txt")]
+
+    # dict.fromkeys: Deduplizierung mit erhaltener Reihenfolge
+    return list(dict.fromkeys(chain.from_iterable(
+        load_wordlist(name) for name in wordlist_names
+    )))
 
 
 def probe_wordlist(client, base_url, wordlist_names, robots_checker=None,
-                   known_paths=None, callback=None, max_requests=None):
+                   known_paths=None, callback=None, max_requests=None,
+                   concurrency=1):
     """Testet Wordlist-Pfade gegen einen Service.
 
     Args:
@@ -66,35 +74,13 @@ def probe_wordlist(client, base_url, wordlist_names, robots_checker=None,
         known_paths: Set bereits bekannter Pfade (werden uebersprungen)
         callback: Funktion(path, response) fuer jeden Fund
         max_requests: Maximale Gesamtzahl Requests (Client-zaehler)
+        concurrency: Anzahl gleichzeitiger Requests (1 = sequentiell)
 
     Returns:
         list: [(path, response), ...] fuer erfolgreiche Pfade
     """
-    base_url = base_url.rstrip("/")
-    paths = load_all_wordlists(wordlist_names)
-    known = known_paths or set()
-    results = []
-
-    for path in paths:
-        if max_requests and client.request_count >= max_requests:
-            break
-        if path in known:
-            continue
-        if robots_checker and not robots_checker.is_allowed(path):
-            continue
-
-        url = f"{base_url}{path}"
-        resp = client.head(url)
-
-        # HEAD liefert manchmal 405 -- dann GET versuchen
-        if resp.status_code == 405:
-            resp = client.get(url)
-
-        # Endpoint gefunden (nicht 404, nicht Connection Error)
-        if resp.status_code > 0 and resp.status_code != 404:
-            results.append((path, resp))
-            known.add(path)
-            if callback:
-                callback(path, resp)
-
-    return results
+    return probe_paths(
+        client, base_url.rstrip("/"), load_all_wordlists(wordlist_names),
+        robots_checker=robots_checker, known_paths=known_paths,
+        callback=callback, max_requests=max_requests, concurrency=concurrency
+    )
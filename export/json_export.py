@@ -5,7 +5,10 @@ Exportiert entdeckte API-Struktur als JSON.
 """
 import json
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+
+# Einmal gebauter Encoder (json.dumps mit Optionen baut pro Aufruf einen neuen)
+_encode = json.JSONEncoder(indent=2, ensure_ascii=False).encode
 
 
 def export_json(db, service, output_path):
@@ -19,8 +22,9 @@ def export_json(db, service, output_path):
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    endpoints = db.get_endpoints(service["id"])
     stats = db.get_service_stats(service["id"])
+    params_by_ep = db.get_parameters_for_service(service["id"])
+    responses_by_ep = db.get_responses_for_service(service["id"])
 
     # Metadata parsen
     meta = {}
@@ -29,61 +33,10 @@ def export_json(db, service, output_path):
     except (json.JSONDecodeError, ValueError):
         pass
 
-    # Endpoints aufbauen
-    paths = {}
-    for ep in endpoints:
-        methods = json.loads(ep.get("methods_json", "[]"))
-        status_codes = json.loads(ep.get("status_codes_json", "[]"))
-        content_types = json.loads(ep.get("content_types_json", "[]"))
-
-        path_info = {
-            "methods": methods,
-            "status_codes": status_codes,
-            "content_types": content_types,
-            "auth_required": bool(ep.get("auth_required")),
-            "auth_type_hint": ep.get("auth_type_hint", ""),
-            "discovered_by": ep.get("discovered_by", ""),
-        }
-
-        # Parameter
-        params = db.get_parameters(ep["id"])
-        if params:
-            path_info["parameters"] = [
-                {
-                    "name": p["name"],
-                    "type": p.get("param_type", "string"),
-                    "location": p.get("location", "query"),
-                    "required": bool(p.get("required")),
-                    "example": p.get("example_value", "")
-                }
-                for p in params
-            ]
-
-        # Responses
-        responses = db.get_responses(ep["id"])
-        if responses:
-            path_info["responses"] = []
-            for resp in responses:
-                resp_info = {
-                    "method": resp["method"],
-                    "status_code": resp["status_code"],
-                    "content_type": resp.get("content_type", ""),
-                    "elapsed_ms": resp.get("elapsed_ms", 0),
-                }
-                try:
-                    schema = json.loads(resp.get("body_schema_json", "{}"))
-                    if schema:
-                        resp_info["schema"] = schema
-                except (json.JSONDecodeError, ValueError):
-                    pass
-                path_info["responses"].append(resp_info)
-
-        paths[ep["path"]] = path_info
-
-    # Gesamtstruktur
-    export_data = {
+    # Gesamtstruktur ohne "paths"; die Pfade werden einzeln geschrieben
+    head = {
         "apiprober_version": "0.1.0",
-        "exported_at": datetime.utcnow().isoformat(),
+        "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
         "service": {
             "name": service["name"],
             "base_url": service["base_url"],
@@ -94,8 +47,71 @@ def export_json(db, service, output_path):
             "metadata": meta,
         },
         "statistics": stats,
-        "paths": paths,
     }
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(export_data, f, indent=2, ensure_ascii=False)
+    # Gleiche Ausgabe wie json.dump(..., indent=2), aber gestreamt: der
+    # Export-Baum wird nie komplett aufgebaut, nur ein Pfad-Eintrag zur Zeit
+    with open(output_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write("{")
+        for key, value in head.items():
+            f.write(f"\n  {_dumps(key)}: {_dumps(value, 1)},")
+        f.write('\n  "paths": {')
+        first = True
+        for ep in db.iter_endpoints(service["id"]):
+            f.write("\n    " if first else ",\n    ")
+            first = False
+            path_info = _path_info(ep, params_by_ep.get(ep["id"]),
+                                   responses_by_ep.get(ep["id"]))
+            f.write(f"{_dumps(ep['path'])}: {_dumps(path_info, 2)}")
+        f.write("}" if first else "\n  }")
+        f.write("\n}")
+
+
+def _dumps(value, level=0):
+    """JSON wie json.dump(indent=2), eingerueckt fuer Verschachtelungstiefe level."""
+    text = _encode(value)
+    return text.replace("\n", "\n" + "  " * level) if level else text
+
+
+def _path_info(ep, params, responses):
+    """Export-Eintrag eines Endpoints inkl. Parametern und Responses."""
+    path_info = {
+        "methods": ep["methods"],
+        "status_codes": ep["status_codes"],
+        "content_types": ep["content_types"],
+        "auth_required": bool(ep.get("auth_required")),
+        "auth_type_hint": ep.get("auth_type_hint", ""),
+        "discovered_by": ep.get("discovered_by", ""),
+    }
+
+    # Parameter
+    if params:
+        path_info["parameters"] = [
+            {
+                "name": p["name"],
+                "type": p.get("param_type", "string"),
+                "location": p.get("location", "query"),
+                "required": bool(p.get("required")),
+                "example": p.get("example_value", "")
+            }
+            for p in params
+        ]
+
+    # Responses
+    if responses:
+        path_info["responses"] = []
+        for resp in responses:
+            resp_info = {
+                "method": resp["method"],
+                "status_code": resp["status_code"],
+                "content_type": resp.get("content_type", ""),
+                "elapsed_ms": resp.get("elapsed_ms", 0),
+            }
+            try:
+                schema = json.loads(resp.get("body_schema_json", "{}"))
+                if schema:
+                    resp_info["schema"] = schema
+            except (json.JSONDecodeError, ValueError):
+                pass
+            path_info["responses"].append(resp_info)
+    return path_info
@@ -71,6 +71,25 @@ class TestApiProberCLI:
         assert result.returncode == 0, "--help sollte erfolgreich sein"
         assert "probe" in result.stdout.lower() or "usage" in result.stdout.lower()
 
+    def test_cli_version_skips_argparse(self):
+        """Test: --version/-V antworten ohne argparse zu laden."""
+        import subprocess
+        code = (
+            "import sys; import api_prober; "
+            "sys.argv = ['api_prober', sys.argv[1]]; rc = api_prober.main(); "
+            "print('argparse' in sys.modules, rc)"
+        )
+        for flag in ("--version", "-V"):
+            result = subprocess.run(
+                [sys.executable, "-c", code, flag],
+                cwd=str(API_PROBER_DIR),
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+            assert result.returncode == 0, result.stderr
+            assert result.stdout.splitlines() == ["ApiProber v0.1.0", "False 0"]
+
     def test_cli_list_works(self):
         """Test: CLI list funktioniert (zeigt Services)."""
         import subprocess
@@ -106,6 +125,207 @@ class TestApiProberDatabase:
             has_tables = any(t in tables for t in expected_tables)
             assert has_tables, f"DB sollte mindestens eine Tabelle haben, gefunden: {tables}"
 
+    def test_transaction_rollback(self, tmp_path):
+        """Test: Fehler in db.transaction() verwirft alle Writes."""
+        from core.database import Database
+
+        db = Database(tmp_path / "test.db")
+        service_id = db.upsert_service("svc", "http://example.invalid")
+
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.upsert_endpoint(service_id, "/a")
+                raise RuntimeError("abbruch")
+        assert db.get_endpoints(service_id) == []
+
+        with db.transaction():
+            ep_id = db.upsert_endpoint(service_id, "/b")
+            db.upsert_parameters_bulk([{"endpoint_id": ep_id, "name": "q"}])
+        assert [p["name"] for p in db.get_parameters(ep_id)] == ["q"]
+        db.close()
+
+
+class TestApiProberConfig:
+    """Test: Konfiguration laden/speichern."""
+
+    def test_load_config_cache_returns_copies(self, tmp_path):
+        """Test: Gecachte Config wird nicht durch Aufrufer veraendert."""
+        from core.config import load_config
+
+        config_path = tmp_path / "config.json"
+        config_path.write_text('{"delay_ms": 100}', encoding="utf-8")
+
+        first = load_config(config_path)
+        first["delay_ms"] = 999
+        first["auth"]["type"] = "bearer"
+
+        second = load_config(config_path)
+        assert second["delay_ms"] == 100
+        assert second["auth"]["type"] == "none"
+
+    def test_save_config_invalidates_cache(self, tmp_path):
+        """Test: save_config macht den Cache ungueltig."""
+        from core.config import load_config, save_config
+
+        config_path = tmp_path / "config.json"
+        config_path.write_text('{"delay_ms": 100}', encoding="utf-8")
+
+        config = load_config(config_path)
+        config["delay_ms"] = 250
+        save_config(config, config_path)
+
+        assert load_config(config_path)["delay_ms"] == 250
+
+
+class TestApiProberRobots:
+    """Test: robots.txt Behandlung."""
+
+    def test_failed_fetch_is_not_cached(self, monkeypatch):
+        """Test: Nach einem Timeout laedt der naechste Checker robots.txt erneut."""
+        import io
+        import urllib.error
+        import urllib.request
+        from core.robots import RobotsChecker
+
+        answers = [urllib.error.URLError("timeout"),
+                   io.BytesIO(b"User-agent: *\nDisallow: /admin\n")]
+
+        def fake_urlopen(req, timeout=None, context=None):
+            answer = answers.pop(0)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        monkeypatch.setattr(urllib.request, "urlopen", fake_urlopen)
+        base_url = "http://robots-cache.invalid"
+
+        assert RobotsChecker(base_url).is_allowed("/admin")
+        assert not RobotsChecker(base_url).is_allowed("/admin")
+        assert not answers
+
+
+class TestApiProberSchema:
+    """Test: Schema-Extraktion."""
+
+    def test_extract_schema_deep_nesting(self):
+        """Test: Tief verschachteltes JSON loest keinen RecursionError aus."""
+        from core.schema_extractor import extract_schema
+
+        data = {"leaf": 1}
+        for _ in range(sys.getrecursionlimit() * 2):
+            data = [data]
+        schema = extract_schema({"a": "xy", "b": data})
+
+        assert schema["field_count"] == 2
+        assert schema["properties"]["a"] == {"type": "string", "example_length": 2}
+        assert schema["properties"]["b"]["type"] == "array"
+
+    def test_extract_schema_truncated_object(self):
+        """Test: Abgeschnittenes Top-Level-Objekt liefert ein Teil-Schema."""
+        from core.schema_extractor import extract_schema_from_body
+
+        body = json.dumps({
+            "data": [{"id": i, "name": "x"} for i in range(20)],
+            "meta": {"total": 20},
+        })
+        schema = extract_schema_from_body(body[:150], truncated=True)
+
+        assert schema["type"] == "object"
+        assert schema["truncated"] is True
+        data = schema["properties"]["data"]
+        assert data["type"] == "array" and 0 < data["length"] < 20
+        assert data["items"]["properties"]["id"] == {"type": "integer"}
+
+
+class _StubClient:
+    """Client-Attrappe: feste Antwort pro Methode, zaehlt Requests."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.sent = []
+
+    def request(self, url, method="GET", **kwargs):
+        from core.http_client import HttpResponse
+        self.sent.append(method)
+        status, headers = self.responses[method]
+        return HttpResponse(url=url, method=method, status_code=status,
+                            headers=headers)
+
+
+class TestApiProberMethods:
+    """Test: Methoden-Test pro Endpoint."""
+
+    def test_allow_header_skips_other_methods(self):
+        """Test: OPTIONS mit Allow-Header ersetzt die Einzel-Requests."""
+        from discovery.method_tester import test_methods
+
+        client = _StubClient({"OPTIONS": (200, {"Allow": "GET, HEAD, OPTIONS"})})
+        info = test_methods(client, "http://example.invalid", "/a")
+
+        assert client.sent == ["OPTIONS"]
+        assert info["methods"] == ["GET", "HEAD", "OPTIONS"]
+
+    def test_auth_challenge_skips_only_safe_methods(self):
+        """Test: Nach 401 werden nur sichere Methoden uebersprungen, ohne Status."""
+        from discovery.method_tester import test_methods
+
+        challenge = (401, {"WWW-Authenticate": "Bearer"})
+        responses = dict.fromkeys(("GET", "HEAD", "OPTIONS"), challenge)
+        responses.update(dict.fromkeys(("POST", "PUT", "PATCH", "DELETE"), (405, {})))
+        client = _StubClient(responses)
+        info = test_methods(client, "http://example.invalid", "/a",
+                            skip_destructive=False)
+
+        assert client.sent == ["OPTIONS", "POST", "PUT", "PATCH", "DELETE"]
+        assert info["methods"] == ["GET", "HEAD", "OPTIONS"]
+        assert info["status_codes"] == {"OPTIONS": 401, "POST": 405, "PUT": 405,
+                                        "PATCH": 405, "DELETE": 405}
+        assert info["auth_required"] and info["auth_type_hint"] == "bearer"
+
+
+class TestApiProberOpenAPI:
+    """Test: OpenAPI-Erkennung."""
+
+    def test_detect_openapi_ignores_body_limit(self):
+        """Test: Specs groesser als max_body_bytes werden trotzdem erkannt."""
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from core.http_client import HttpClient
+        from discovery.openapi_detect import detect_openapi
+
+        paths = {f"/items/{i}": {"get": {"summary": "x" * 50}} for i in range(100)}
+        spec = json.dumps({"openapi": "3.0.0", "paths": paths}).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                found = self.path == "/openapi.json"
+                self.send_response(200 if found else 404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(spec) if found else 0))
+                self.end_headers()
+                if found:
+                    self.wfile.write(spec)
+
+            do_HEAD = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        try:
+            for concurrency in (1, 4):
+                client = HttpClient({"delay_ms": 0, "max_body_bytes": 1024})
+                spec_url, data, _ = detect_openapi(client, base_url,
+                                                   concurrency=concurrency)
+                client.close()
+                assert spec_url == f"{base_url}/openapi.json"
+                assert len(data["paths"]) == 100
+        finally:
+            server.shutdown()
+            server.server_close()
+
 
 class TestApiProberQuickProbe:
     """Test: Schneller Probe-Test (minimale API-Abfrage)."""